@@ -25,10 +25,17 @@ classes for different purposes. This package uses a small set of tools based
 in `tools` folder. It is not a part of the current package.
 """
 
+import spectral.batch as batch
 import spectral.blackbody as blackbody
+import spectral.catalog as catalog
 import spectral.constructor as constructor
+import spectral.executor as executor
 import spectral.filter as filter
 import spectral.interpolation as interpolation
+import spectral.library as library
+import spectral.material as material
+import spectral.reader as reader
+import spectral.shared as shared
 import spectral.spectrum as spectrum
 import spectral.color_tools as wavelength_to_rgb
 
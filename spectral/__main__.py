@@ -0,0 +1,80 @@
+"""Command line interface of the package.
+
+Commands:
+    - `catalog` - computes characteristics of stars of a catalog, see
+      :py:mod:`spectral.catalog`.
+    - `dump` - prints a results file as CSV.
+
+Run `python -m spectral <command> --help` for details.
+"""
+
+import argparse
+import csv
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from spectral import catalog, executor
+
+
+def _catalog(args):
+    if args.workers == 1:
+        pool = 'serial'
+    else:
+        pool = ProcessPoolExecutor(args.workers or None)
+    try:
+        with executor.using_executor(pool):
+            n = catalog.run(args.input, args.output,
+                            chunk_size=args.chunk_size,
+                            precision=args.precision,
+                            delimiter=args.delimiter)
+    finally:
+        if pool != 'serial':
+            pool.shutdown()
+    print("Processed %d stars." % n, file=sys.stderr)
+
+
+def _dump(args):
+    names = [name for name, _ in catalog.COLUMNS]
+    writer = csv.writer(sys.stdout)
+    writer.writerow(names)
+    for group in catalog.read_results(args.results):
+        writer.writerows(zip(*(group[name] for name in names)))
+
+
+def main(argv=None):
+    """Runs a command line command.
+
+    :param argv: command line arguments, `sys.argv[1:]` if None
+    :type argv: list of str, None
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m spectral',
+        description="Stellar spectra generation and processing.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser(
+        'catalog', help="compute characteristics of stars of a catalog")
+    p.add_argument('input', help="CSV catalog with id, temperature (K) "
+                                 "and radius (solar radii) columns")
+    p.add_argument('output', help="results file")
+    p.add_argument('--chunk-size', type=int, default=10000,
+                   help="number of stars in a chunk (default: 10000)")
+    p.add_argument('--precision', type=int, default=300,
+                   help="number of points in spectra (default: 300)")
+    p.add_argument('--delimiter', default=',',
+                   help="catalog column delimiter (default: ',')")
+    p.add_argument('--workers', type=int, default=0,
+                   help="number of worker processes, 1 disables "
+                        "parallelism (default: number of CPUs)")
+    p.set_defaults(func=_catalog)
+
+    p = commands.add_parser('dump', help="print a results file as CSV")
+    p.add_argument('results', help="results file")
+    p.set_defaults(func=_dump)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
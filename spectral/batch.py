@@ -0,0 +1,338 @@
+"""This module provides a container for many spectra sharing the same set
+of x values (wavelength grid).
+
+Instead of a separate :class:`spectral.spectrum.Spectrum` with its own copy of
+the grid for each spectrum, :class:`SpectrumBatch` stores the grid once and all
+intensities as a single contiguous (N, M) float64 matrix.
+
+**Example**:
+::
+
+    >>>from spectral.batch import SpectrumBatch
+    >>>b = SpectrumBatch((1., 2., 3.), ((0., 1., 0.), (1., 1., 1.)),
+    ...                  interpolation='line')
+    >>>b.integrate()
+    [1.0, 2.0]
+    >>>b[1].lines[0]
+    (1.0, 1.0)
+
+"""
+
+from array import array
+from itertools import cycle, repeat
+from operator import add, mul, sub
+
+from .interpolation import Interpolator
+from .spectrum import Spectrum, _as_float_array
+
+
+class SpectrumBatch:
+    """Container for a batch of spectra on a shared grid.
+
+    Spectra in a batch have the same x values, the same type and the same
+    interpolation method. Batches support the same arithmetic as
+    :class:`spectral.spectrum.Spectrum` (with another batch of the same
+    shape or with a single spectrum on the same grid) and reductions which
+    return one value per spectrum. Indexing returns a spectrum which shares
+    memory with the batch.
+
+    :param x_values: sorted x values shared by all spectra
+    :type x_values: array, iterable of float
+    :param intensities: intensity rows, one per spectrum, each of the same
+        length as x_values
+    :type intensities: iterable of iterables of float
+    :param spectrum_type: default is Spectrum, type of the spectra
+    :type spectrum_type: type
+    :param interpolation: default is 'point', interpolation method name
+    :type interpolation: str
+
+    :raises ValueError: if a row length doesn't match the grid
+    """
+
+    def __init__(self, x_values, intensities, spectrum_type=Spectrum,
+                 interpolation='point'):
+        x = _as_float_array(x_values)
+        m = len(x)
+        data = array('d')
+        for row in intensities:
+            n = len(data)
+            data.extend(row)
+            if len(data) - n != m:
+                raise ValueError(
+                    "Row length doesn't match the grid: %d != %d"
+                    % (len(data) - n, m))
+        self._set_data(x, data, spectrum_type, interpolation)
+
+    @classmethod
+    def from_spectra(cls, spectra):
+        """Constructs a batch from spectra with matching x values.
+
+        The type and the interpolation method of the first spectrum are used.
+
+        :param spectra: spectra of the same type on the same grid
+        :type spectra: iterable of Spectrum
+
+        :return: new batch
+        :rtype: SpectrumBatch
+
+        :raises ValueError: if spectra is empty or grids do not match
+        :raises TypeError: if spectra types do not match
+        """
+        spectra = iter(spectra)
+        try:
+            first = next(spectra)
+        except StopIteration:
+            raise ValueError("Can't construct a batch without spectra.")
+        x = first._x
+        data = array('d', first._y)
+        for s in spectra:
+            if type(s) is not type(first):
+                raise TypeError(
+                    "Type mismatch error: %s and %s" % (type(first), type(s)))
+            if s._x is not x and s._x != x:
+                raise ValueError("Spectral lines of given spectra do not "
+                                 "match each other.")
+            data.extend(s._y)
+        return cls._wrap(x, data, type(first), first.interpolation)
+
+    @classmethod
+    def _wrap(cls, x, data, spectrum_type, interpolation):
+        """Private constructor wrapping already validated float64 buffers.
+        """
+        batch = cls.__new__(cls)
+        batch._set_data(x, data, spectrum_type, interpolation)
+        return batch
+
+    def _set_data(self, x, data, spectrum_type, interpolation):
+        self._x, self._data = x, data
+        self.spectrum_type = spectrum_type
+        self.interpolation = interpolation
+        self._weights = dict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('_x', '_data'):
+            if isinstance(state[name], memoryview):
+                state[name] = array('d', state[name])
+        return state
+
+    @property
+    def shape(self):
+        """Number of spectra and number of points in each of them.
+
+        :rtype: (int, int)
+        """
+        m = len(self._x)
+        return len(self._data) // m, m
+
+    @property
+    def x_values(self):
+        """Returns a read-only view of the shared x values.
+
+        :rtype: memoryview of float
+        """
+        return memoryview(self._x).toreadonly()
+
+    @property
+    def intensities(self):
+        """Returns a read-only two-dimensional (N, M) view of intensities.
+
+        :rtype: memoryview of float
+        """
+        return memoryview(self._data).cast('B').cast(
+            'd', self.shape).toreadonly()
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        """Returns a spectrum by index or a new batch by slice.
+
+        Returned spectra share memory with the batch.
+        """
+        n, m = self.shape
+        if isinstance(item, slice):
+            rows = range(n)[item]
+            if rows.step == 1:
+                data = self._data[rows.start * m:rows.stop * m]
+            else:
+                data = array('d')
+                for i in rows:
+                    data.extend(self._row(i))
+            return self._wrap(self._x, data, self.spectrum_type,
+                              self.interpolation)
+        if item < 0:
+            item += n
+        if not 0 <= item < n:
+            raise IndexError("Batch index out of range.")
+        return self.spectrum_type._wrap(self._x, self._row(item),
+                                        self.interpolation)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _row(self, i):
+        """Private method returning a zero-copy view of a row."""
+        m = len(self._x)
+        return memoryview(self._data)[i * m:(i + 1) * m]
+
+    def _rows(self):
+        """Private generator of rows (copies of array data or views of
+        memoryview data, fast for reductions)."""
+        m = len(self._x)
+        for i in range(0, len(self._data), m):
+            yield self._data[i:i + m]
+
+    def integrate(self, x0=None, x1=None):
+        """Integrates every spectrum in a specified range.
+
+        Integration weights for the grid and the range are computed once
+        (see :func:`spectral.interpolation.Interpolator.integration_weights`)
+        and cached, so each spectrum costs a single weighted sum.
+        See :func:`spectral.spectrum.Spectrum.integrate`.
+
+        :param x0: bottom border
+        :type x0: float, None
+        :param x1: top border
+        :type x1: float, None
+
+        :return: integral for each spectrum
+        :rtype: list of float
+
+        :raises ValueError: if x0 > x1
+        """
+        start, weights = self._integration_weights(x0, x1)
+        stop = start + len(weights)
+        m = len(self._x)
+        data = self._data
+        return [sum(map(mul, weights, data[i + start:i + stop]))
+                for i in range(0, len(data), m)]
+
+    def _integration_weights(self, x0, x1):
+        """Private method returning cached integration weights trimmed to
+        the non-zero window as (start index, weights).
+        """
+        key = (self.interpolation, x0, x1)
+        if key not in self._weights:
+            w = Interpolator.integration_weights(
+                self._x, self.interpolation, x0, x1)
+            nonzero = [j for j, c in enumerate(w) if c]
+            if nonzero:
+                start, stop = nonzero[0], nonzero[-1] + 1
+            else:
+                start, stop = 0, 0
+            self._weights[key] = start, w[start:stop]
+        return self._weights[key]
+
+    @property
+    def maximum(self):
+        """Returns maximum point of every spectrum.
+
+        :return: (x, y) of the maximum for each spectrum
+        :rtype: list of (float, float)
+        """
+        result = []
+        indexes = range(len(self._x))
+        for row in self._rows():
+            n = max(indexes, key=row.__getitem__)
+            result.append((self._x[n], row[n]))
+        return result
+
+    def band_intensities(self, names=None):
+        """Returns band intensities of every spectrum.
+
+        Only for spectrum types providing `bands`, see
+        :func:`spectral.blackbody.ElectromagneticSpectrum.band_intensities`.
+
+        :param names: band identifiers, all bands if None
+        :type names: iterable of str, None
+
+        :return: band name to list of flux densities mapping
+        :rtype: dict
+        """
+        bands = self.spectrum_type.bands
+        if names is None:
+            names = bands.keys()
+        return {name: self.integrate(*bands[name]) for name in names}
+
+    def resample(self, other):
+        """Resamples every spectrum of the batch to the x values of another
+        spectrum or batch.
+
+        :param other: sample spectrum or batch
+        :type other: Spectrum, SpectrumBatch
+
+        :return: new batch on the grid of other
+        :rtype: SpectrumBatch
+        """
+        x = other._x
+        data = array('d')
+        for i in range(len(self)):
+            f = Interpolator(self._x, self._row(i), self.interpolation)
+            data.extend(f.many(x))
+        return self._wrap(x, data, self.spectrum_type, self.interpolation)
+
+    def _combine(self, other, op):
+        """Private method applying a binary operation to intensities of the
+        batch and another batch or a spectrum.
+
+        :raises TypeError: if spectrum types do not match
+        :raises ValueError: if x values or shapes do not match
+        """
+        if isinstance(other, SpectrumBatch):
+            if other.spectrum_type != self.spectrum_type:
+                raise TypeError("Type mismatch error: %s and %s"
+                                % (self.spectrum_type, other.spectrum_type))
+            if len(other._data) != len(self._data):
+                raise ValueError("Batch shapes do not match: %s and %s"
+                                 % (self.shape, other.shape))
+            y = other._data
+        elif type(other) is self.spectrum_type:
+            y = cycle(other._y)
+        else:
+            raise TypeError("Type mismatch error: %s and %s"
+                            % (type(self), type(other)))
+        if self._x is not other._x and self._x != other._x:
+            raise ValueError("Spectral lines of given spectra do not "
+                             "match each other.")
+        return self._wrap(self._x, array('d', op(self._data, y)),
+                          self.spectrum_type, self.interpolation)
+
+    def __add__(self, other):
+        """Sums spectra row by row, see
+        :func:`spectral.spectrum.Spectrum.__add__`. If other is a single
+        spectrum, it is added to every spectrum of the batch.
+
+        :param other: other batch or spectrum
+        :type other: SpectrumBatch, Spectrum
+
+        :return: new batch
+        :rtype: SpectrumBatch
+        """
+        return self._combine(other, lambda y1, y2: map(add, y1, y2))
+
+    def __sub__(self, other):
+        """Subtracts spectra row by row, see
+        :func:`spectral.spectrum.Spectrum.__sub__`.
+
+        :param other: other batch or spectrum
+        :type other: SpectrumBatch, Spectrum
+
+        :return: new batch
+        :rtype: SpectrumBatch
+        """
+        return self._combine(
+            other, lambda y1, y2: map(max, map(sub, y1, y2), repeat(0.)))
+
+    def __mul__(self, other):
+        """Multiplies spectra row by row, see
+        :func:`spectral.spectrum.Spectrum.__mul__`.
+
+        :param other: other batch or spectrum
+        :type other: SpectrumBatch, Spectrum
+
+        :return: new batch
+        :rtype: SpectrumBatch
+        """
+        return self._combine(other, lambda y1, y2: map(mul, y1, y2))
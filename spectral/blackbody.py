@@ -2,10 +2,15 @@
 """
 
 import math
+from array import array
+from itertools import islice, repeat
+from operator import mul, sub, truediv
 
-from .spectrum import Spectrum
+from .batch import SpectrumBatch
+from .spectrum import Spectrum, _as_float_array
 from .filter import SpectrumFilter
-from .constructor import SpectrumConstructor
+from .material import as_vectorized
+from .constructor import GridConfig, SpectrumConstructor
 
 WIEN_C = 2.8977729 * 10**-3  # wien's displacement law constant in m * K
 H = 6.63 * 10.**-34.  # J/s planck
@@ -68,6 +73,31 @@ class ElectromagneticSpectrum(Spectrum):
         """
         return self.integrate(*self.bands[band_name])
 
+    def band_intensities(self, names=None):
+        """Returns intensities for several bands at once.
+
+        Boundaries of all requested bands are sorted and the cumulative
+        integral of the spectrum is evaluated once in each unique boundary,
+        so the cost doesn't grow with the number of bands sharing borders.
+
+        :param names: band identifiers, see
+            :func:`ElectromagneticSpectrum.bands`. All bands if None.
+        :type names: iterable of str, None
+
+        :return: band name to flux density mapping, ordered as names
+        :rtype: dict
+
+        :raises KeyError: if a band name is not present in bands
+        """
+        if names is None:
+            names = self.bands.keys()
+        ranges = [(name, self.bands[name]) for name in names]
+        edges = sorted({x for _, band in ranges for x in band})
+        f = self.interpolator.antiderivative
+        integrals = dict(zip(edges, map(f, edges)))
+        return {name: integrals[x1] - integrals[x0]
+                for name, (x0, x1) in ranges}
+
     @property
     def relative_visual_intensity(self):
         """Returns intensity in a visual range compared to overall intensity.
@@ -130,11 +160,9 @@ class BlackbodySpectrumConstructor(ElectromagneticSpectrumConstructor):
     It can be used for good approximations of normal star radiation spectra
     (see figures).
 
-    Spectral boundaries will be defined automatically. You may modify the
-    range manually by setting all checks mentioned above to *False* and by
-    :py:meth:`.constructor.SpectrumConstructor.set_spectral_range` or
-    :py:meth:`ElectromagneticSpectrumConstructor.set_spectral_range_by_bands`
-    but it's not recommended.
+    Spectral boundaries will be defined automatically. You may set the
+    range manually for a single call with `grid` argument
+    (see :class:`.constructor.GridConfig`), but it's not recommended.
 
     The class uses progressive scale
     (see :py:attribute:`.constructor.SpectrumConstructor.progressive_scale`)
@@ -142,7 +170,8 @@ class BlackbodySpectrumConstructor(ElectromagneticSpectrumConstructor):
     related to wavelength. At lower wavelengths ticks will be more frequent.
     Set better precision with
     :py:meth:`.constructor.SpectrumConstructor.set_precision`
-    method if you are concerned about it. Default precision is 300 points.
+    method or with `grid` argument if you are concerned about it. Default
+    precision is 300 points.
 
     The constructor will try to define maximum of the spectrum using
     Wien's law (again, google it) and locate 99.9% of the total flux inside
@@ -176,6 +205,8 @@ class BlackbodySpectrumConstructor(ElectromagneticSpectrumConstructor):
 
     :param temperature: black body surface temperature in kelvins
     :type temperature: float
+    :param grid: grid settings overriding class defaults for this call
+    :type grid: spectral.constructor.GridConfig, None
 
     :return: electromagnetic spectrum of a black body with given temperature
     :rtype: ElectromagneticSpectrum
@@ -219,6 +250,30 @@ class BlackbodySpectrumConstructor(ElectromagneticSpectrumConstructor):
         flux = cls._k0 / wavelength**5. / (exponent - 1.)
         return flux
 
+    @classmethod
+    def _func_many(cls, wavelengths, temperature):
+        """Private spectrum construction function evaluating Planck
+        distribution for all wavelengths at once.
+
+        Every step is mapped over the whole array with built-in functions,
+        in the same order of operations as in :func:`_func`, so results are
+        bit-compatible with it (including the overflow clamp).
+
+        :param wavelengths: wavelengths (each must be >= 10**-10 m)
+        :type wavelengths: array of float
+        :param temperature: temperature of a radiating surface
+        :type temperature: float
+
+        :return: intensity values
+        :rtype: array of float
+        """
+        p = map(truediv, repeat(cls._k1 / temperature), wavelengths)
+        exponent = map(math.exp, map(min, repeat(700.), p))
+        flux = map(truediv, repeat(cls._k0), map(pow, wavelengths,
+                                                 repeat(5.)))
+        return array('d', map(truediv, flux,
+                              map(sub, exponent, repeat(1.))))
+
     @classmethod
     def _define_spectral_range(cls, temperature):
         """Defines spectral range, where 99% of spectrum will be located.
@@ -251,13 +306,57 @@ class BlackbodySpectrumConstructor(ElectromagneticSpectrumConstructor):
                     w1 = vis1
         return w0, w1
 
+    @classmethod
+    def batch(cls, temperatures, grid=None):
+        """Constructs black body spectra for many temperatures on a common
+        wavelength grid.
+
+        Planck distribution is evaluated over the outer product of the
+        temperatures and the grid: the wavelength-only part of the law is
+        computed once and shared by all rows. Intensities are bit-compatible
+        with spectra constructed one by one on the same grid.
+
+        :param temperatures: black body surface temperatures in kelvins
+        :type temperatures: iterable of float
+        :param grid: wavelengths in m, for example `spectrum.x_values`. If
+            None or a :class:`spectral.constructor.GridConfig` without a
+            range, a grid covering spectral ranges of all temperatures is
+            created.
+        :type grid: iterable of float, GridConfig, None
+
+        :return: batch of electromagnetic spectra, one row per temperature
+        :rtype: spectral.batch.SpectrumBatch
+
+        :raises ValueError: if any temperature <= 1
+        """
+        temperatures = tuple(temperatures)
+        for t in temperatures:
+            if t <= 1.:
+                raise ValueError(
+                    "Temperature must be positive. Got %f" % t)
+        if grid is None or isinstance(grid, GridConfig):
+            w0, w1 = zip(*map(cls._define_spectral_range, temperatures))
+            grid = cls._grid_config(grid, (min(w0), max(w1))).wavelist
+        else:
+            grid = _as_float_array(grid)
+        flux = array('d', map(truediv, repeat(cls._k0),
+                              map(pow, grid, repeat(5.))))
+        data = array('d')
+        for t in temperatures:
+            p = map(truediv, repeat(cls._k1 / t), grid)
+            exponent = map(math.exp, map(min, repeat(700.), p))
+            data.extend(map(truediv, flux, map(sub, exponent, repeat(1.))))
+        return SpectrumBatch._wrap(
+            grid, data, cls._spectrum_type, 'point')
+
     @staticmethod
-    def __new__(cls, temperature):
+    def __new__(cls, temperature, grid=None):
         if temperature <= 1.:
             raise ValueError(
                 "Temperature must be positive. Got %f" % temperature)
-        cls.set_spectral_range(*cls._define_spectral_range(temperature))
-        return super().__new__(cls, temperature)
+        grid = cls._grid_config(
+            grid, cls._define_spectral_range(temperature))
+        return super().__new__(cls, temperature, grid=grid)
 
 
 class RayleighFilter(SpectrumFilter):
@@ -277,6 +376,7 @@ class RayleighFilter(SpectrumFilter):
                                 - refractive_index(wavelength, temperature)
                                   usually ~1.0 for gases at normal conditions
                                 - v - molecule volume in cubic meters
+                            Functions may accept wavelength sequences.
                             See :py:mod:`spectral.mock_material` for more info.
     :type mat_abundances: tuple, list of (Material, float)
     :param molecules: absolute number of molecules on a light's path
@@ -322,6 +422,30 @@ class RayleighFilter(SpectrumFilter):
             sigma_total += mod * c
         return y0 * max(0., 1. - sigma_total * molecules)
 
+    @staticmethod
+    def _transmission(x, args):
+        """Private function calculating rayleigh scattering attenuation
+        factors for given wavelengths. See :func:`RayleighFilter._func`.
+        """
+        mat_abundances, molecules, t = args
+        w4 = [w**4. for w in x]
+        sigma_total = [0.] * len(x)
+        for mat, c in mat_abundances:
+            mat = as_vectorized(mat)
+            k = mat.v**2 * RayleighFilter._k
+            sigma_total = [
+                sigma + k * ((n**2 - 1) / (n**2 + 2))**2 / w * c
+                for sigma, n, w in zip(
+                    sigma_total, mat.refractive_index(x, t), w4)]
+        return [max(0., 1. - sigma * molecules) for sigma in sigma_total]
+
+    @staticmethod
+    def _func_array(x, y, filter_y, args):
+        """Private function calculating rayleigh scattering effect for all
+        points of a spectrum at once. See :func:`RayleighFilter._func`.
+        """
+        return map(mul, y, RayleighFilter._transmission(x, args))
+
     @staticmethod
     def __new__(cls, spectrum, mat_abundances, molecules, temperature):
         return super().__new__(
@@ -352,6 +476,7 @@ class PhotoAbsoprtion(SpectrumFilter):
                            attributes and methods:
                                 - photoeffect_cross_section(wavelength,
                                 temperature) in m3, usually < 10**-30
+                            Functions may accept wavelength sequences.
                             See :py:mod:`spectral.mock_material` for more info.
     :type mat_abundances: tuple, list of (Material, float)
     :param molecules: absolute number of molecules on a light's path
@@ -376,7 +501,102 @@ class PhotoAbsoprtion(SpectrumFilter):
             sigma += c * mat.photoeffect_cross_section(w, t)
         return y0 * math.exp(-molecules * sigma)
 
+    @staticmethod
+    def _transmission(x, args):
+        """Private function calculating photoelectric absorption attenuation
+        factors for given wavelengths. See :func:`PhotoAbsoprtion._func`.
+        """
+        mat_abundances, molecules, t = args
+        sigma = [0.] * len(x)
+        for mat, c in mat_abundances:
+            cross_sections = as_vectorized(mat).photoeffect_cross_section(x, t)
+            sigma = [s + c * cs for s, cs in zip(sigma, cross_sections)]
+        return [math.exp(-molecules * s) for s in sigma]
+
+    @staticmethod
+    def _func_array(x, y, filter_y, args):
+        """Private function calculating resulting beam intensities after the
+        photoelectric absorption process for all points of a spectrum at
+        once. See :func:`PhotoAbsoprtion._func`.
+        """
+        return map(mul, y, PhotoAbsoprtion._transmission(x, args))
+
     @staticmethod
     def __new__(cls, spectrum, mat_abundances, molecules, temperature):
         return super().__new__(
             cls, spectrum, None, mat_abundances, molecules, temperature)
+
+
+class LayeredAtmosphereFilter(SpectrumFilter):
+    """This class provides a filter of a multi-layer atmosphere.
+
+    Each layer is described by its composition, column density and
+    temperature. Attenuation of every layer by every process (by default
+    Rayleigh scattering and photoelectric absorption, see
+    :class:`RayleighFilter` and :class:`PhotoAbsoprtion`) is computed for the
+    whole grid, giving a (layers x wavelengths) transmission matrix, which
+    is reduced to a single transmission curve by multiplication. The curve is
+    cached (see :func:`spectral.filter.SpectrumFilter.transmission_curve`),
+    so the same atmosphere costs one multiplication for each next spectrum.
+
+    The result is the same as applying the filters for each layer one after
+    another, but without intermediate spectra.
+
+    :param spectrum: spectrum to be filtered
+    :type spectrum: ElectromagneticSpectrum
+    :param layers: (mat_abundances, molecules, temperature) for each layer,
+                   where mat_abundances is a composition of the layer
+                   (see :class:`RayleighFilter`), molecules is the column
+                   density (absolute number of molecules on a light's path
+                   through the layer) and temperature is the layer
+                   temperature in kelvins
+    :type layers: iterable of (tuple, int, float)
+    :param filters: default is (RayleighFilter, PhotoAbsoprtion), filter
+                    classes providing attenuation processes
+    :type filters: tuple of type
+
+    :return: filtered spectrum
+    :rtype: ElectromagneticSpectrum
+    """
+
+    @classmethod
+    def layer_transmissions(cls, x_values, layers,
+                            filters=(RayleighFilter, PhotoAbsoprtion)):
+        """Returns transmission matrix of the atmosphere: transmission of
+        each layer by all filters for each x value.
+
+        :param x_values: wavelengths
+        :type x_values: array, sequence of float
+        :param layers: (mat_abundances, molecules, temperature) for each layer
+        :type layers: iterable of (tuple, int, float)
+        :param filters: filter classes providing transmission curves
+        :type filters: tuple of type
+
+        :return: one row of transmissions for each layer
+        :rtype: list of array of float
+        """
+        matrix = []
+        for layer in layers:
+            row = repeat(1., len(x_values))
+            for f in filters:
+                row = map(mul, row, f._transmission(x_values, tuple(layer)))
+            matrix.append(array('d', row))
+        return matrix
+
+    @staticmethod
+    def _transmission(x, args):
+        """Private function reducing layer transmissions to a total
+        transmission of the atmosphere.
+        """
+        layers, filters = args
+        transmission = repeat(1.)
+        for row in LayeredAtmosphereFilter.layer_transmissions(
+                x, layers, filters):
+            transmission = map(mul, transmission, row)
+        return array('d', islice(transmission, len(x)))
+
+    @staticmethod
+    def __new__(cls, spectrum, layers,
+                filters=(RayleighFilter, PhotoAbsoprtion)):
+        return super().__new__(
+            cls, spectrum, None, tuple(layers), tuple(filters))
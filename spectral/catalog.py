@@ -0,0 +1,379 @@
+"""This module provides a pipeline computing characteristics of stars of
+large catalogs.
+
+A catalog is a CSV table with `id`, `temperature` (K) and `radius` (solar
+radii) columns, other columns are ignored. The catalog is read in chunks,
+chunks are processed on the current executor (see
+:py:mod:`spectral.executor`) and results are written to a columnar results
+file in catalog order. Only a few chunks are in memory at any moment, so
+memory usage doesn't depend on the catalog size.
+
+Temperatures are split into fixed logarithmic bins (each next bin starts
+at a 1.25 times higher temperature). Every bin has its own wavelength grid
+covering spectral ranges of all its temperatures, see
+:func:`spectral_range`. Spectra of stars of a chunk falling into the same
+bin are constructed as one :class:`spectral.batch.SpectrumBatch` on the
+grid of the bin and reduced with batch methods. Grids don't depend on
+other stars, so results of a star don't depend on the chunk size or the
+order of the catalog.
+
+Results file consists of a header and row groups (one per chunk). Each row
+group stores the number of rows and then every column contiguously:
+float64 columns as little-endian arrays, string columns as uint32 byte
+lengths followed by utf-8 data. See :func:`read_results`.
+
+**Example**:
+::
+
+    $ python -m spectral catalog stars.csv results.spc --chunk-size 10000
+    $ python -m spectral dump results.spc
+
+"""
+
+import csv
+import math
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+from itertools import islice
+
+from .blackbody import BlackbodySpectrumConstructor, ElectromagneticSpectrum
+from .color_tools import ColorGenerator
+from .constructor import GridConfig
+from .executor import get_executor
+
+SUN_RADIUS = 695.7 * 10**6
+"""Solar radius in m."""
+
+COLUMNS = (
+    ('id', 's'),
+    ('temperature', 'd'),
+    ('radius', 'd'),
+    ('peak_wavelength', 'd'),
+    ('luminosity', 'd'),
+    ('visible_fraction', 'd'),
+    ('visible_luminosity', 'd'),
+    ('r', 'd'),
+    ('g', 'd'),
+    ('b', 'd'),
+)
+"""Columns of results: name and type ('s' - string, 'd' - float64).
+Wavelengths are in m, luminosities in W, colors are
+:func:`spectral.color_tools.ColorGenerator.spectrum_to_rgb` 0..255 values.
+"""
+
+_MAGIC = b'SPCR'
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHH')
+_COLUMN = struct.Struct('<cH')
+_ROWS = struct.Struct('<Q')
+
+_BIN_RATIO = 1.25
+
+
+def read_catalog(file, chunk_size=10000, delimiter=','):
+    """Reads a catalog in chunks.
+
+    :param file: path or a text file opened for reading
+    :type file: str, os.PathLike, file object
+    :param chunk_size: (default=10000) number of stars in a chunk
+    :type chunk_size: int
+    :param delimiter: (default=',') column delimiter
+    :type delimiter: str
+
+    :return: generator of (ids, temperatures, radii) chunks
+    :rtype: generator of (list of str, array of float, array of float)
+
+    :raises ValueError: if chunk size < 1, required columns or values are
+        missing, a value is not a number, a temperature is not a finite
+        number > 1 or a radius is not a finite number > 0
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be >= 1, but got %d" % chunk_size)
+    if not hasattr(file, 'read'):
+        with open(file, newline='', encoding='utf-8') as f:
+            yield from read_catalog(f, chunk_size, delimiter)
+        return
+    rows = csv.DictReader(file, delimiter=delimiter)
+    missing = {'id', 'temperature', 'radius'} - set(rows.fieldnames or ())
+    if missing:
+        raise ValueError("Catalog columns are missing: %s"
+                         % ', '.join(sorted(missing)))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        ids = []
+        for row in chunk:
+            if row['id'] is None:
+                raise ValueError("Catalog row has no id: %r" % (row,))
+            ids.append(row['id'])
+        yield (ids,
+               array('d', (_value(row, 'temperature', 1.) for row in chunk)),
+               array('d', (_value(row, 'radius', 0.) for row in chunk)))
+
+
+def _value(row, name, minimum):
+    """Private function returning a finite number > minimum from a catalog
+    row.
+
+    :raises ValueError: if the value is missing, not a number or out of
+        range
+    """
+    if row[name] is None:
+        raise ValueError("%s of star %s is missing"
+                         % (name.capitalize(), row['id']))
+    try:
+        value = float(row[name])
+    except ValueError:
+        raise ValueError("%s of star %s is not a number: %r"
+                         % (name.capitalize(), row['id'], row[name]))
+    if not minimum < value < math.inf:
+        raise ValueError("%s of star %s must be a finite number > %g, but "
+                         "got %r" % (name.capitalize(), row['id'], minimum,
+                                     value))
+    return value
+
+
+def _bin(temperature):
+    """Private function returning the bin number of a temperature."""
+    return math.floor(math.log(temperature, _BIN_RATIO))
+
+
+def spectral_range(temperature):
+    """Returns the wavelength range of the grid used for a temperature,
+    which is the range of its temperature bin (see
+    :py:mod:`spectral.catalog`).
+
+    :param temperature: temperature in K
+    :type temperature: float
+
+    :return: (minimal, maximum) wavelengths in m
+    :rtype: (float, float)
+    """
+    k = _bin(temperature)
+    t0, t1 = _BIN_RATIO ** k, _BIN_RATIO ** (k + 1)
+    constructor = BlackbodySpectrumConstructor
+    w0, _ = constructor._define_spectral_range(t1)
+    _, w1 = constructor._define_spectral_range(t0)
+    gate0, gate1 = constructor.visual_t_gate
+    if not constructor.ignore_visual and t0 < gate1 and t1 > gate0:
+        vis0, vis1 = constructor.visible_range
+        w0, w1 = min(w0, vis0), max(w1, vis1)
+    return w0, w1
+
+
+def _groups(temperatures):
+    """Private function grouping star indexes by temperature bins."""
+    groups = dict()
+    for i, t in enumerate(temperatures):
+        groups.setdefault(_bin(t), []).append(i)
+    return groups.values()
+
+
+def process_chunk(ids, temperatures, radii, precision=300):
+    """Computes characteristics of stars, see :data:`COLUMNS`.
+
+    Spectra are constructed on grids of temperature bins, see
+    :func:`spectral_range`.
+
+    :param ids: star identifiers
+    :type ids: list of str
+    :param temperatures: surface temperatures in K
+    :type temperatures: sequence of float
+    :param radii: radii in solar radii
+    :type radii: sequence of float
+    :param precision: (default=300) number of points in spectra
+    :type precision: int
+
+    :return: column name to values mapping
+    :rtype: dict
+
+    :raises ValueError: if any temperature <= 1
+    """
+    n = len(ids)
+    columns = {name: array('d', bytes(8 * n))
+               for name, kind in COLUMNS if kind == 'd'}
+    columns['id'] = list(ids)
+    columns['temperature'] = array('d', temperatures)
+    columns['radius'] = array('d', radii)
+    vis = ElectromagneticSpectrum.bands['VIS']
+    for group in _groups(temperatures):
+        grid = GridConfig(spectral_range(temperatures[group[0]]), precision)
+        batch = BlackbodySpectrumConstructor.batch(
+            [temperatures[i] for i in group], grid=grid)
+        total = batch.integrate()
+        visible = batch.integrate(*vis)
+        peaks = batch.maximum
+        colors = ColorGenerator.batch_to_rgb(batch)
+        for k, i in enumerate(group):
+            area = 4. * math.pi * (SUN_RADIUS * radii[i]) ** 2.
+            fraction = visible[k] / total[k]
+            columns['peak_wavelength'][i] = peaks[k][0]
+            columns['luminosity'][i] = total[k] * area
+            columns['visible_fraction'][i] = fraction
+            columns['visible_luminosity'][i] = total[k] * area * fraction
+            for name, c in zip('rgb', colors[k]):
+                columns[name][i] = c
+    return columns
+
+
+def _process(chunk, precision):
+    """Private picklable chunk processing function."""
+    return process_chunk(*chunk, precision=precision)
+
+
+class ResultsWriter:
+    """Writer of results files, see :py:mod:`spectral.catalog`.
+
+    :param file: path or a binary file opened for writing
+    :type file: str, os.PathLike, file object
+    """
+
+    def __init__(self, file):
+        self._owned = not hasattr(file, 'write')
+        self._file = open(file, 'wb') if self._owned else file
+        self._file.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION,
+                                      len(COLUMNS)))
+        for name, kind in COLUMNS:
+            name = name.encode()
+            self._file.write(_COLUMN.pack(kind.encode(), len(name)) + name)
+        self.rows = 0
+
+    def write(self, columns):
+        """Writes a row group.
+
+        :param columns: column name to values mapping, see :data:`COLUMNS`
+        :type columns: dict
+        """
+        n = len(columns['id'])
+        self._file.write(_ROWS.pack(n))
+        for name, kind in COLUMNS:
+            if kind == 's':
+                data = [str(v).encode() for v in columns[name]]
+                lengths = array('I', map(len, data))
+                self._file.write(_little_endian(lengths))
+                self._file.write(b''.join(data))
+            else:
+                self._file.write(_little_endian(array('d', columns[name])))
+        self.rows += n
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _little_endian(values):
+    """Private function returning array data as little-endian bytes."""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read(file, size):
+    """Private function reading exactly size bytes.
+
+    :raises ValueError: if the file ends earlier
+    """
+    data = file.read(size)
+    if len(data) != size:
+        raise ValueError("Results file is truncated.")
+    return data
+
+
+def _from_little_endian(typecode, data):
+    """Private function returning an array from little-endian bytes."""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def read_results(file):
+    """Reads a results file by row groups.
+
+    :param file: path or a binary file opened for reading
+    :type file: str, os.PathLike, file object
+
+    :return: generator of column name to values mappings
+    :rtype: generator of dict
+
+    :raises ValueError: if the file is not a valid results file
+    """
+    if not hasattr(file, 'read'):
+        with open(file, 'rb') as f:
+            yield from read_results(f)
+        return
+    magic, version, n_columns = _HEADER.unpack(_read(file, _HEADER.size))
+    if magic != _MAGIC:
+        raise ValueError("Not a results file: wrong magic bytes.")
+    if version != _FORMAT_VERSION:
+        raise ValueError("Unsupported results file version: %d" % version)
+    columns = []
+    for _ in range(n_columns):
+        kind, size = _COLUMN.unpack(_read(file, _COLUMN.size))
+        columns.append((_read(file, size).decode(), kind.decode()))
+    while True:
+        data = file.read(_ROWS.size)
+        if not data:
+            break
+        n, = _ROWS.unpack(data)
+        group = dict()
+        for name, kind in columns:
+            if kind == 's':
+                lengths = _from_little_endian('I', _read(file, 4 * n))
+                data = _read(file, sum(lengths))
+                values, i = [], 0
+                for length in lengths:
+                    values.append(data[i:i + length].decode())
+                    i += length
+                group[name] = values
+            else:
+                group[name] = _from_little_endian('d', _read(file, 8 * n))
+        yield group
+
+
+def run(catalog, output, chunk_size=10000, precision=300, delimiter=','):
+    """Processes a catalog and writes a results file.
+
+    Chunks are processed with the current executor (see
+    :py:mod:`spectral.executor`), at most two chunks per CPU are in flight.
+
+    :param catalog: catalog path or a text file, see :func:`read_catalog`
+    :type catalog: str, os.PathLike, file object
+    :param output: results path or a binary file
+    :type output: str, os.PathLike, file object
+    :param chunk_size: (default=10000) number of stars in a chunk
+    :type chunk_size: int
+    :param precision: (default=300) number of points in spectra
+    :type precision: int
+    :param delimiter: (default=',') catalog column delimiter
+    :type delimiter: str
+
+    :return: number of processed stars
+    :rtype: int
+    """
+    executor = get_executor()
+    limit = 2 * (os.cpu_count() or 1)
+    pending = deque()
+    with ResultsWriter(output) as writer:
+        for chunk in read_catalog(catalog, chunk_size, delimiter):
+            if executor is None:
+                writer.write(_process(chunk, precision))
+                continue
+            pending.append(executor.submit(_process, chunk, precision))
+            if len(pending) >= limit:
+                writer.write(pending.popleft().result())
+        while pending:
+            writer.write(pending.popleft().result())
+        return writer.rows
@@ -3,8 +3,25 @@
 .. note:: Based on Dan Bruton's code:
           http://www.physics.sfasu.edu/astro/color/spectra.html
 
+:class:`CIEColorGenerator` provides a colorimetric alternative based on the
+CIE 1931 2-degree standard observer (XYZ, xyY and sRGB colors).
+
+:class:`TemperatureColorTable` stores precomputed colors of black bodies for
+fast queries by temperature and by color.
+
 """
 
+import math
+from array import array
+from bisect import bisect
+from functools import lru_cache
+from itertools import repeat
+from operator import mul
+
+from .blackbody import BlackbodySpectrumConstructor
+from .constructor import GridConfig
+from .interpolation import Interpolator
+
 
 class ColorGenerator:
     """Color generator class provides different functions for cosmic source
@@ -19,6 +36,10 @@ class ColorGenerator:
         for a sample of spectrum points and returns an average value. This is
         more precise method than just determining a color using Wien's law.
 
+        Color weights of spectrum points depend only on the grid and gamma,
+        so they are computed once and cached, and the color is three weighted
+        sums of intensities.
+
         If the whole spectrum lies beyond visual range (380-750nm) then
         it will return zeros.
 
@@ -31,17 +52,40 @@ class ColorGenerator:
         :return: color in RGB scale, example: [100, 200, 255]
         :rtype: list
         """
-        color = [0., 0., 0.]
-        for n, (w, i) in enumerate(spectrum.lines[1:]):
-            w0, i0 = spectrum.lines[n]
-            dw, di = abs(w - w0), abs(i - i0)
-            w_a = w0 + 0.5 * dw
-            if (w_a < ColorGenerator._visual_range[0] or w_a >
-                ColorGenerator._visual_range[1]): continue
-            s = (min(i, i0) + 0.5 * di) * dw
-            c_point = ColorGenerator.wavelength_to_rgb(
-                w_a, gamma, float_values=True)
-            color = [c0 + s * cp for c0, cp in zip(color, c_point)]
+        start, columns = _color_weights(bytes(spectrum._x), gamma)
+        y = spectrum._y[start:start + len(columns[0])]
+        color = [sum(map(mul, column, y)) for column in columns]
+        return ColorGenerator._normalize(color, float_values)
+
+    @staticmethod
+    def batch_to_rgb(batch, gamma=0.8, float_values=False):
+        """Returns colors of all spectra in a batch, see
+        :func:`ColorGenerator.spectrum_to_rgb`.
+
+        Color weights are computed once for the shared grid, so the color of
+        each spectrum is three weighted sums.
+
+        :param batch: batch of electromagnetic spectra
+        :type batch: spectral.batch.SpectrumBatch
+        :param gamma: (default=0.8) adjustable coefficient
+        :type gamma: float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale for each spectrum
+        :rtype: list of list
+        """
+        start, columns = _color_weights(bytes(batch._x), gamma)
+        stop = start + len(columns[0])
+        m = len(batch._x)
+        data = batch._data
+        return [ColorGenerator._normalize(
+            [sum(map(mul, column, data[i + start:i + stop]))
+             for column in columns], float_values)
+            for i in range(0, len(data), m)]
+
+    @staticmethod
+    def _normalize(color, float_values):
+        """Private method normalizing summed color to the brightest one."""
         photons = sum(color)
         if photons:
             if float_values:
@@ -59,6 +103,9 @@ class ColorGenerator:
         color value. The wavelength should be from 380 nm through 750 nm
         otherwise it will return zeros (i.e. black color).
 
+        For many wavelengths use :func:`ColorGenerator.wavelengths_to_rgb`
+        or an approximate :class:`WavelengthColorTable`.
+
         :param wavelength: wavelength of incoming photons in m
         :type wavelength: float
         :param gamma: (default=0.8) adjustable coefficient
@@ -68,39 +115,634 @@ class ColorGenerator:
         :return: color in RGB scale, example: [100, 200, 255]
         :rtype: list
         """
-        wavelength *= 10. ** 9.
-        if 380. <= wavelength < 440.:
-            attenuation = 0.3 + 0.7 * (wavelength - 380.) / (440. - 380.)
-            r = ((-(wavelength - 440.) / (440. - 380.)) * attenuation) ** gamma
-            g = 0.0
-            b = (1.0 * attenuation) ** gamma
-        elif 440. <= wavelength < 490.:
-            r = 0.0
-            g = ((wavelength - 440.) / (490. - 440.)) ** gamma
-            b = 1.0
-        elif 440. <= wavelength < 510.:
-            r = 0.0
-            g = 1.0
-            b = (-(wavelength - 510.) / (510. - 490.)) ** gamma
-        elif 510. <= wavelength < 580.:
-            r = ((wavelength - 510.) / (580. - 510.)) ** gamma
-            g = 1.0
-            b = 0.0
-        elif 580. <= wavelength < 645.:
-            r = 1.0
-            g = (-(wavelength - 645.) / (645. - 580.)) ** gamma
-            b = 0.0
-        elif 645. <= wavelength < 750.:
-            attenuation = 0.3 + 0.7 * (750. - wavelength) / (750. - 645.)
-            r = (1.0 * attenuation) ** gamma
-            g = 0.0
-            b = 0.0
-        else:
-            r = 0.0
-            g = 0.0
-            b = 0.0
+        r, g, b = _rgb(wavelength * 10. ** 9., gamma)
         if not float_values:
             r = int(255. * r)
             g = int(255. * g)
             b = int(255. * b)
         return [r, g, b]
+
+    @staticmethod
+    def wavelengths_to_rgb(wavelengths, gamma=0.8, float_values=False):
+        """Array version of :func:`ColorGenerator.wavelength_to_rgb`,
+        results are equal to the scalar function for every wavelength.
+
+        :param wavelengths: wavelengths of incoming photons in m
+        :type wavelengths: iterable of float
+        :param gamma: (default=0.8) adjustable coefficient
+        :type gamma: float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: (N, 3) colors in RGB scale, one row per wavelength
+        :rtype: list of list
+        """
+        colors = map(_rgb, map(mul, wavelengths, repeat(10. ** 9.)),
+                     repeat(gamma))
+        if float_values:
+            return list(map(list, colors))
+        return [[int(255. * r), int(255. * g), int(255. * b)]
+                for r, g, b in colors]
+
+
+def _rgb(wavelength, gamma):
+    """Private function returning float RGB values for a wavelength in nm.
+    """
+    if 380. <= wavelength < 440.:
+        attenuation = 0.3 + 0.7 * (wavelength - 380.) / (440. - 380.)
+        r = ((-(wavelength - 440.) / (440. - 380.)) * attenuation) ** gamma
+        g = 0.0
+        b = (1.0 * attenuation) ** gamma
+    elif 440. <= wavelength < 490.:
+        r = 0.0
+        g = ((wavelength - 440.) / (490. - 440.)) ** gamma
+        b = 1.0
+    elif 440. <= wavelength < 510.:
+        r = 0.0
+        g = 1.0
+        b = (-(wavelength - 510.) / (510. - 490.)) ** gamma
+    elif 510. <= wavelength < 580.:
+        r = ((wavelength - 510.) / (580. - 510.)) ** gamma
+        g = 1.0
+        b = 0.0
+    elif 580. <= wavelength < 645.:
+        r = 1.0
+        g = (-(wavelength - 645.) / (645. - 580.)) ** gamma
+        b = 0.0
+    elif 645. <= wavelength < 750.:
+        attenuation = 0.3 + 0.7 * (750. - wavelength) / (750. - 645.)
+        r = (1.0 * attenuation) ** gamma
+        g = 0.0
+        b = 0.0
+    else:
+        r = 0.0
+        g = 0.0
+        b = 0.0
+    return r, g, b
+
+
+@lru_cache(maxsize=64)
+def _color_weights(grid, gamma):
+    """Private function returning color weights of grid points as
+    (start index, (red, green, blue) columns) trimmed to the visual range.
+    The grid is passed as bytes of a float64 array.
+
+    Each bin between two neighbouring points adds its average intensity
+    times its width with the color of its middle, so half of this
+    contribution is a weight of each of the two points.
+    """
+    x = array('d')
+    x.frombytes(grid)
+    w0, w1 = ColorGenerator._visual_range
+    columns = tuple(array('d', bytes(8 * len(x))) for _ in range(3))
+    start, stop = 0, 0
+    for j in range(1, len(x)):
+        dw = x[j] - x[j - 1]
+        w_a = x[j - 1] + 0.5 * dw
+        if w_a < w0 or w_a > w1:
+            continue
+        if not stop:
+            start = j - 1
+        stop = j + 1
+        for column, c in zip(columns, _rgb(w_a * 10. ** 9., gamma)):
+            column[j - 1] += 0.5 * dw * c
+            column[j] += 0.5 * dw * c
+    return start, tuple(column[start:stop] for column in columns)
+
+
+class WavelengthColorTable:
+    """Precomputed lookup table for
+    :func:`ColorGenerator.wavelength_to_rgb` with a fixed gamma.
+
+    The visual range is sampled with a given number of points once, then each
+    query is an index computation, a gather of two neighbouring table rows
+    and a linear interpolation between them. The error compared to the direct
+    computation (:func:`ColorGenerator.wavelengths_to_rgb`) shrinks with
+    resolution (the default is a 1 nm step).
+
+    :param gamma: (default=0.8) adjustable coefficient
+    :type gamma: float
+    :param resolution: (default=371) number of table points, >= 2
+    :type resolution: int
+
+    :raises ValueError: if resolution < 2
+    """
+
+    def __init__(self, gamma=0.8, resolution=371):
+        if resolution < 2:
+            raise ValueError(
+                "Resolution must be >= 2, but got %d" % resolution)
+        self.gamma = gamma
+        self.resolution = int(resolution)
+        w0, w1 = ColorGenerator._visual_range
+        self._w0 = w0
+        self._step = (w1 - w0) / (self.resolution - 1)
+        waves = [w0 + self._step * i for i in range(self.resolution - 1)]
+        waves.append(math.nextafter(w1, 0.))
+        self._table = [_rgb(w * 10. ** 9., gamma) for w in waves]
+
+    def __call__(self, wavelength, float_values=False):
+        """Returns an approximate RGB color for a wavelength.
+
+        See :func:`ColorGenerator.wavelength_to_rgb` for parameters
+        description.
+
+        :return: color in RGB scale
+        :rtype: list
+        """
+        u = (wavelength - self._w0) / self._step
+        if not 0. <= u < self.resolution - 1:
+            rgb = [0.0, 0.0, 0.0]
+        else:
+            i = int(u)
+            u -= i
+            c0, c1 = self._table[i], self._table[i + 1]
+            rgb = [a + (b - a) * u for a, b in zip(c0, c1)]
+        if not float_values:
+            rgb = [int(255. * c) for c in rgb]
+        return rgb
+
+    def many(self, wavelengths, float_values=False):
+        """Returns approximate RGB colors for wavelengths.
+
+        :param wavelengths: wavelengths of incoming photons in m
+        :type wavelengths: iterable of float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: (N, 3) colors in RGB scale, one row per wavelength
+        :rtype: list of list
+        """
+        return [self(w, float_values) for w in wavelengths]
+
+
+class CIEColorGenerator:
+    """Colorimetric color estimation with CIE 1931 2-degree color matching
+    functions.
+
+    Color matching functions are tabulated from 380 nm through 780 nm with
+    5 nm step. For every wavelength grid they are interpolated once and
+    multiplied by integration weights of the grid, so XYZ values of a
+    spectrum are three weighted sums of its intensities. Projection weights
+    are cached per grid.
+
+    XYZ values are integrals of intensity multiplied by color matching
+    functions over wavelength in m, so they are in the units of the
+    spectrum integral.
+    """
+    _xyz_to_linear_srgb = ((3.2406, -1.5372, -0.4986),
+                           (-0.9689, 1.8758, 0.0415),
+                           (0.0557, -0.2040, 1.0570))
+
+    @staticmethod
+    def spectrum_to_xyz(spectrum):
+        """Returns CIE 1931 XYZ tristimulus values of a spectrum.
+
+        :param spectrum: electromagnetic spectrum of a source
+        :type spectrum: ElectromagneticSpectrum
+
+        :return: [X, Y, Z]
+        :rtype: list of float
+        """
+        start, columns = _cie_weights(bytes(spectrum._x))
+        y = spectrum._y[start:start + len(columns[0])]
+        return [sum(map(mul, column, y)) for column in columns]
+
+    @staticmethod
+    def batch_to_xyz(batch):
+        """Returns CIE 1931 XYZ tristimulus values of all spectra in a batch,
+        see :func:`CIEColorGenerator.spectrum_to_xyz`.
+
+        :param batch: batch of electromagnetic spectra
+        :type batch: spectral.batch.SpectrumBatch
+
+        :return: [X, Y, Z] for each spectrum
+        :rtype: list of list
+        """
+        start, columns = _cie_weights(bytes(batch._x))
+        stop = start + len(columns[0])
+        m = len(batch._x)
+        data = batch._data
+        return [[sum(map(mul, column, data[i + start:i + stop]))
+                 for column in columns]
+                for i in range(0, len(data), m)]
+
+    @staticmethod
+    def xyz_to_xyy(xyz):
+        """Converts XYZ values to chromaticity coordinates and luminance.
+
+        :param xyz: [X, Y, Z]
+        :type xyz: sequence of float
+
+        :return: [x, y, Y], zeros for zero XYZ
+        :rtype: list of float
+        """
+        total = sum(xyz)
+        if not total:
+            return [0., 0., 0.]
+        return [xyz[0] / total, xyz[1] / total, xyz[1]]
+
+    @staticmethod
+    def xyz_to_srgb(xyz, float_values=False):
+        """Converts XYZ values to a gamma encoded sRGB color.
+
+        Linear sRGB values are clipped to the sRGB gamut and normalized
+        to the brightest channel, so the result is a color of a source
+        regardless of its brightness.
+
+        :param xyz: [X, Y, Z]
+        :type xyz: sequence of float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale, example: [100, 200, 255]
+        :rtype: list
+        """
+        rgb = [max(sum(map(mul, row, xyz)), 0.)
+               for row in CIEColorGenerator._xyz_to_linear_srgb]
+        brightest = max(rgb)
+        if brightest:
+            rgb = [_srgb_gamma(c / brightest) for c in rgb]
+        if not float_values:
+            rgb = [int(round(255. * c)) for c in rgb]
+        return rgb
+
+    @staticmethod
+    def spectrum_to_xyy(spectrum):
+        """Returns CIE 1931 chromaticity coordinates and luminance of
+        a spectrum, see :func:`CIEColorGenerator.xyz_to_xyy`.
+
+        :param spectrum: electromagnetic spectrum of a source
+        :type spectrum: ElectromagneticSpectrum
+
+        :return: [x, y, Y]
+        :rtype: list of float
+        """
+        return CIEColorGenerator.xyz_to_xyy(
+            CIEColorGenerator.spectrum_to_xyz(spectrum))
+
+    @staticmethod
+    def spectrum_to_srgb(spectrum, float_values=False):
+        """Returns sRGB color of a spectrum, see
+        :func:`CIEColorGenerator.xyz_to_srgb`.
+
+        :param spectrum: electromagnetic spectrum of a source
+        :type spectrum: ElectromagneticSpectrum
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale, example: [100, 200, 255]
+        :rtype: list
+        """
+        return CIEColorGenerator.xyz_to_srgb(
+            CIEColorGenerator.spectrum_to_xyz(spectrum), float_values)
+
+    @staticmethod
+    def batch_to_srgb(batch, float_values=False):
+        """Returns sRGB colors of all spectra in a batch, see
+        :func:`CIEColorGenerator.spectrum_to_srgb`.
+
+        :param batch: batch of electromagnetic spectra
+        :type batch: spectral.batch.SpectrumBatch
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale for each spectrum
+        :rtype: list of list
+        """
+        return [CIEColorGenerator.xyz_to_srgb(xyz, float_values)
+                for xyz in CIEColorGenerator.batch_to_xyz(batch)]
+
+
+class TemperatureColorTable:
+    """Precomputed colors of black bodies on a logarithmic temperature grid.
+
+    For every temperature of the table a black body spectrum is constructed
+    on a dense wavelength grid covering the visual range, and its color is
+    stored both as :func:`ColorGenerator.spectrum_to_rgb` float values and
+    as CIE 1931 XYZ values normalized to Y = 1
+    (see :class:`CIEColorGenerator`). Queries interpolate linearly between
+    two neighbouring rows in log temperature, temperatures outside the table
+    are clamped to it.
+
+    Colors of black bodies change monotonically with temperature, so the
+    inverse index is a binary search of a color key (blue minus red
+    for RGB and x chromaticity for XYZ) followed by a linear interpolation.
+
+    Tables are serialisable with :meth:`TemperatureColorTable.to_dict` and
+    :meth:`TemperatureColorTable.from_dict` (JSON-compatible) or pickle.
+
+    **Example**:
+    ::
+
+        >>>table = TemperatureColorTable()
+        >>>table.rgb(5800)
+        [255, 239, 209]
+        >>>round(table.temperature_for_rgb(table.rgb(5800, True)))
+        5800
+
+    :param t_range: (default is
+        :py:attr:`.blackbody.BlackbodySpectrumConstructor.visual_t_gate`)
+        minimum and maximum temperature in K
+    :type t_range: (float, float)
+    :param resolution: (default=512) number of table temperatures, >= 2
+    :type resolution: int
+    :param gamma: (default=0.8) gamma coefficient of RGB colors
+    :type gamma: float
+
+    :raises ValueError: if resolution < 2 or temperature range is invalid
+    """
+    _grid = GridConfig((360. * 10 ** -9, 830. * 10 ** -9), 471, False)
+
+    def __init__(self, t_range=BlackbodySpectrumConstructor.visual_t_gate,
+                 resolution=512, gamma=0.8):
+        t0, t1 = t_range
+        if resolution < 2:
+            raise ValueError(
+                "Resolution must be >= 2, but got %d" % resolution)
+        if not 1. < t0 < t1:
+            raise ValueError(
+                "Invalid temperature range: %s" % (tuple(t_range),))
+        log_t0, log_t1 = math.log(t0), math.log(t1)
+        step = (log_t1 - log_t0) / (resolution - 1)
+        temperatures = [math.exp(log_t0 + step * i)
+                        for i in range(resolution)]
+        batch = BlackbodySpectrumConstructor.batch(
+            temperatures, grid=self._grid)
+        rgb = array('d')
+        for c in ColorGenerator.batch_to_rgb(batch, gamma, True):
+            rgb.extend(c)
+        xyz = array('d')
+        for c in CIEColorGenerator.batch_to_xyz(batch):
+            xyz.extend(v / c[1] for v in c)
+        self._set_data(log_t0, step, gamma, rgb, xyz)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Constructs a table from :meth:`TemperatureColorTable.to_dict`
+        output.
+
+        :param data: table data
+        :type data: dict
+
+        :return: new table
+        :rtype: TemperatureColorTable
+        """
+        table = cls.__new__(cls)
+        table._set_data(data['log_t0'], data['step'], data['gamma'],
+                        array('d', data['rgb']), array('d', data['xyz']))
+        return table
+
+    def to_dict(self):
+        """Returns table data as a JSON-compatible dictionary.
+
+        :rtype: dict
+        """
+        return {'log_t0': self._log_t0, 'step': self._step,
+                'gamma': self.gamma, 'rgb': self._rgb.tolist(),
+                'xyz': self._xyz.tolist()}
+
+    def _set_data(self, log_t0, step, gamma, rgb, xyz):
+        self._log_t0, self._step = log_t0, step
+        self.gamma = gamma
+        self._rgb, self._xyz = rgb, xyz
+        self.resolution = len(rgb) // 3
+        self._rgb_keys = array('d', map(
+            self._rgb_key, (rgb[i:i + 3] for i in range(0, len(rgb), 3))))
+        self._xyz_keys = array('d', map(
+            self._xyz_key, (xyz[i:i + 3] for i in range(0, len(xyz), 3))))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self._set_data(state['log_t0'], state['step'], state['gamma'],
+                       array('d', state['rgb']), array('d', state['xyz']))
+
+    @property
+    def t_range(self):
+        """Minimum and maximum temperature of the table in K.
+
+        :rtype: (float, float)
+        """
+        return (math.exp(self._log_t0),
+                math.exp(self._log_t0 + self._step * (self.resolution - 1)))
+
+    def _lookup(self, values, temperature):
+        """Private method interpolating a table row for a temperature."""
+        u = (math.log(temperature) - self._log_t0) / self._step
+        u = min(max(u, 0.), self.resolution - 1.)
+        i = min(int(u), self.resolution - 2)
+        u -= i
+        j = 3 * i
+        a, b, c = values[j], values[j + 1], values[j + 2]
+        return [a + (values[j + 3] - a) * u, b + (values[j + 4] - b) * u,
+                c + (values[j + 5] - c) * u]
+
+    def rgb(self, temperature, float_values=False):
+        """Returns color of a black body, see
+        :func:`ColorGenerator.spectrum_to_rgb`.
+
+        :param temperature: black body temperature in K
+        :type temperature: float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale, example: [100, 200, 255]
+        :rtype: list
+        """
+        color = self._lookup(self._rgb, temperature)
+        if not float_values:
+            color = [int(255. * c) for c in color]
+        return color
+
+    def xyz(self, temperature):
+        """Returns CIE 1931 XYZ values of a black body normalized to Y = 1.
+
+        :param temperature: black body temperature in K
+        :type temperature: float
+
+        :return: [X, Y, Z]
+        :rtype: list of float
+        """
+        return self._lookup(self._xyz, temperature)
+
+    def rgb_many(self, temperatures, float_values=False):
+        """Returns colors of black bodies, see
+        :meth:`TemperatureColorTable.rgb`.
+
+        :param temperatures: black body temperatures in K
+        :type temperatures: iterable of float
+        :param float_values: if True, then float 0..1 values will be returned
+
+        :return: color in RGB scale for each temperature
+        :rtype: list of list
+        """
+        return [self.rgb(t, float_values) for t in temperatures]
+
+    def xyz_many(self, temperatures):
+        """Returns XYZ values of black bodies, see
+        :meth:`TemperatureColorTable.xyz`.
+
+        :param temperatures: black body temperatures in K
+        :type temperatures: iterable of float
+
+        :return: [X, Y, Z] for each temperature
+        :rtype: list of list
+        """
+        return [self.xyz(t) for t in temperatures]
+
+    @staticmethod
+    def _rgb_key(rgb):
+        """Private method returning a color key increasing with temperature,
+        independent of the color scale (int or float values)."""
+        r, g, b = rgb
+        return (b - r) / (max(rgb) or 1.)
+
+    @staticmethod
+    def _xyz_key(xyz):
+        """Private method returning a color key increasing with temperature,
+        negative x chromaticity."""
+        return -xyz[0] / (sum(xyz) or 1.)
+
+    def _inverse(self, keys, key):
+        """Private method returning temperature for a color key."""
+        i = bisect(keys, key)
+        if i == 0:
+            u = 0.
+        elif i == len(keys):
+            u = len(keys) - 1.
+        else:
+            k0, k1 = keys[i - 1], keys[i]
+            u = i - 1 + (key - k0) / (k1 - k0)
+        return math.exp(self._log_t0 + self._step * u)
+
+    def temperature_for_rgb(self, rgb):
+        """Returns temperature of a black body with the nearest color.
+
+        :param rgb: color as int 0..255 or float 0..1 values
+        :type rgb: sequence of float
+        :return: temperature in K
+        :rtype: float
+        """
+        return self._inverse(self._rgb_keys, self._rgb_key(rgb))
+
+    def temperature_for_xyz(self, xyz):
+        """Returns temperature of a black body with the nearest chromaticity.
+
+        :param xyz: [X, Y, Z] in any scale
+        :type xyz: sequence of float
+        :return: temperature in K
+        :rtype: float
+        """
+        return self._inverse(self._xyz_keys, self._xyz_key(xyz))
+
+
+def _srgb_gamma(c):
+    """Private function applying sRGB transfer function to a linear value.
+    """
+    if c <= 0.0031308:
+        return 12.92 * c
+    return 1.055 * c ** (1. / 2.4) - 0.055
+
+
+@lru_cache(maxsize=64)
+def _cie_weights(grid):
+    """Private function returning CIE XYZ projection weights of grid points
+    as (start index, (x, y, z) columns) trimmed to the range of color
+    matching functions. The grid is passed as bytes of a float64 array.
+    """
+    x = array('d')
+    x.frombytes(grid)
+    waves = [row[0] * 10. ** -9 for row in _CIE_1931_2DEG]
+    inside = [j for j, w in enumerate(x) if waves[0] <= w <= waves[-1]]
+    if not inside:
+        return 0, (array('d'), array('d'), array('d'))
+    start, stop = inside[0], inside[-1] + 1
+    weights = Interpolator.integration_weights(x, 'line')[start:stop]
+    columns = []
+    for k in (1, 2, 3):
+        cmf = Interpolator(waves, [row[k] for row in _CIE_1931_2DEG], 'line')
+        columns.append(array('d', map(mul, weights, cmf.many(x[start:stop]))))
+    return start, tuple(columns)
+
+
+_CIE_1931_2DEG = (
+    (380., 0.001368, 0.000039, 0.006450),
+    (385., 0.002236, 0.000064, 0.010550),
+    (390., 0.004243, 0.000120, 0.020050),
+    (395., 0.007650, 0.000217, 0.036210),
+    (400., 0.014310, 0.000396, 0.067850),
+    (405., 0.023190, 0.000640, 0.110200),
+    (410., 0.043510, 0.001210, 0.207400),
+    (415., 0.077630, 0.002180, 0.371300),
+    (420., 0.134380, 0.004000, 0.645600),
+    (425., 0.214770, 0.007300, 1.039050),
+    (430., 0.283900, 0.011600, 1.385600),
+    (435., 0.328500, 0.016840, 1.622960),
+    (440., 0.348280, 0.023000, 1.747060),
+    (445., 0.348060, 0.029800, 1.782600),
+    (450., 0.336200, 0.038000, 1.772110),
+    (455., 0.318700, 0.048000, 1.744100),
+    (460., 0.290800, 0.060000, 1.669200),
+    (465., 0.251100, 0.073900, 1.528100),
+    (470., 0.195360, 0.090980, 1.287640),
+    (475., 0.142100, 0.112600, 1.041900),
+    (480., 0.095640, 0.139020, 0.812950),
+    (485., 0.057950, 0.169300, 0.616200),
+    (490., 0.032010, 0.208020, 0.465180),
+    (495., 0.014700, 0.258600, 0.353300),
+    (500., 0.004900, 0.323000, 0.272000),
+    (505., 0.002400, 0.407300, 0.212300),
+    (510., 0.009300, 0.503000, 0.158200),
+    (515., 0.029100, 0.608200, 0.111700),
+    (520., 0.063270, 0.710000, 0.078250),
+    (525., 0.109600, 0.793200, 0.057250),
+    (530., 0.165500, 0.862000, 0.042160),
+    (535., 0.225750, 0.914850, 0.029840),
+    (540., 0.290400, 0.954000, 0.020300),
+    (545., 0.359700, 0.980300, 0.013400),
+    (550., 0.433450, 0.994950, 0.008750),
+    (555., 0.512050, 1.000000, 0.005750),
+    (560., 0.594500, 0.995000, 0.003900),
+    (565., 0.678400, 0.978600, 0.002750),
+    (570., 0.762100, 0.952000, 0.002100),
+    (575., 0.842500, 0.915400, 0.001800),
+    (580., 0.916300, 0.870000, 0.001650),
+    (585., 0.978600, 0.816300, 0.001400),
+    (590., 1.026300, 0.757000, 0.001100),
+    (595., 1.056700, 0.694900, 0.001000),
+    (600., 1.062200, 0.631000, 0.000800),
+    (605., 1.045600, 0.566800, 0.000600),
+    (610., 1.002600, 0.503000, 0.000340),
+    (615., 0.938400, 0.441200, 0.000240),
+    (620., 0.854450, 0.381000, 0.000190),
+    (625., 0.751400, 0.321000, 0.000100),
+    (630., 0.642400, 0.265000, 0.000050),
+    (635., 0.541900, 0.217000, 0.000030),
+    (640., 0.447900, 0.175000, 0.000020),
+    (645., 0.360800, 0.138200, 0.000010),
+    (650., 0.283500, 0.107000, 0.000000),
+    (655., 0.218700, 0.081600, 0.000000),
+    (660., 0.164900, 0.061000, 0.000000),
+    (665., 0.121200, 0.044580, 0.000000),
+    (670., 0.087400, 0.032000, 0.000000),
+    (675., 0.063600, 0.023200, 0.000000),
+    (680., 0.046770, 0.017000, 0.000000),
+    (685., 0.032900, 0.011920, 0.000000),
+    (690., 0.022700, 0.008210, 0.000000),
+    (695., 0.015840, 0.005723, 0.000000),
+    (700., 0.011359, 0.004102, 0.000000),
+    (705., 0.008111, 0.002929, 0.000000),
+    (710., 0.005790, 0.002091, 0.000000),
+    (715., 0.004109, 0.001484, 0.000000),
+    (720., 0.002899, 0.001047, 0.000000),
+    (725., 0.002049, 0.000740, 0.000000),
+    (730., 0.001440, 0.000520, 0.000000),
+    (735., 0.001000, 0.000361, 0.000000),
+    (740., 0.000690, 0.000249, 0.000000),
+    (745., 0.000476, 0.000172, 0.000000),
+    (750., 0.000332, 0.000120, 0.000000),
+    (755., 0.000235, 0.000085, 0.000000),
+    (760., 0.000166, 0.000060, 0.000000),
+    (765., 0.000117, 0.000042, 0.000000),
+    (770., 0.000083, 0.000030, 0.000000),
+    (775., 0.000059, 0.000021, 0.000000),
+    (780., 0.000042, 0.000015, 0.000000),
+)
+"""CIE 1931 2-degree color matching functions as
+(wavelength in nm, x, y, z) rows."""
@@ -2,12 +2,99 @@
 
 Each spectrum should be constructed through a specific spectrum constructor,
 which would provide valid data.
+
+Spectral range and precision are class-level defaults of a constructor. To
+construct spectra with other settings without modifying the class (for
+example from several threads), pass an immutable :class:`GridConfig` with
+`grid` keyword argument.
 """
 
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
 from tools.classproperty import classproperty
 from .spectrum import Spectrum
 
 
+@lru_cache(maxsize=256)
+def _create_wavelist(spectrum_range, precision, progressive_scale):
+    """Private function returning x axis values for a given range and number
+    of points.
+
+    Grids are cached, so spectra constructed with the same settings share
+    a single read-only grid object and may be compared by identity.
+    """
+
+    def _create_progressive_division():
+        k = dw / (precision * (precision - 1) // 2)
+        s = w_min
+        for i in range(precision):
+            s += k * i
+            yield s
+
+    w_min, w_max = spectrum_range
+    dw = w_max - w_min
+    if progressive_scale:
+        waves = _create_progressive_division()
+    else:
+        step = dw / precision
+        waves = (w_min + step * i for i in range(precision))
+    return memoryview(array('d', waves)).toreadonly()
+
+
+class GridConfig(namedtuple('GridConfig', ('spectrum_range', 'precision',
+                                           'progressive_scale'))):
+    """Immutable configuration of a spectrum x axis.
+
+    Fields left as None are taken from the constructor: a range computed for
+    the specific call (as in
+    :class:`spectral.blackbody.BlackbodySpectrumConstructor`) or class
+    defaults. Use `config._replace(precision=500)` to derive new configs.
+
+    :param spectrum_range: (minimal, maximum) x values
+    :type spectrum_range: (float, float), None
+    :param precision: number of points, should be >= 2
+    :type precision: int, None
+    :param progressive_scale: if x axis has progressive linear scale division
+    :type progressive_scale: bool, None
+
+    :raises ValueError: if range or precision are not valid
+    """
+    __slots__ = ()
+
+    def __new__(cls, spectrum_range=None, precision=None,
+                progressive_scale=None):
+        if spectrum_range is not None:
+            band1, band2 = spectrum_range
+            if band1 >= band2:
+                raise ValueError(
+                    "Wrong spectral range, because %f "
+                    "has higher wavelengths than %f" % (band1, band2))
+            spectrum_range = (band1, band2)
+        if precision is not None:
+            if precision < 2:
+                raise ValueError(
+                    "Precision must be in range 1 - 1000, but got %d"
+                    % precision)
+            precision = int(precision)
+        return super().__new__(
+            cls, spectrum_range, precision, progressive_scale)
+
+    @property
+    def wavelist(self):
+        """Read-only x axis values defined by the config. Equal configs
+        return the same cached object.
+
+        :rtype: memoryview of float
+
+        :raises ValueError: if some fields are not defined
+        """
+        if None in self:
+            raise ValueError("Grid config is not complete: %r" % (self,))
+        return _create_wavelist(*self)
+
+
 class SpectrumConstructor:
     """Abstract base class for spectrum constructors.
 
@@ -15,10 +102,17 @@ class SpectrumConstructor:
     Spectrum instance.
 
     :func:`SpectrumConstructor._func` actually is only method to be redefined.
+    :func:`SpectrumConstructor._func_many` may be redefined too to evaluate all
+    points of the spectrum at once.
 
     `SpectrumConstructor.progressive_scale` boolean parameter controls if x
     axis has progressive linear scale division or not.
 
+    Constructors accept `grid` keyword argument with a :class:`GridConfig`
+    overriding class defaults for a single call. Constructors never modify
+    class attributes themselves, so they are safe to call concurrently as
+    long as class defaults aren't changed meanwhile.
+
     :return: specific spectrum
     :rtype: Spectrum
     """
@@ -89,37 +183,49 @@ class SpectrumConstructor:
         cls._spectrum_range = (band1, band2)
 
     @classmethod
-    def _return_spectrum(cls, values, *args):
-        """Private method which generates intensity values.
+    def _func_many(cls, values, *args):
+        """Private method which generates intensity values for all x values
+        at once.
+
+        By default it calls :func:`SpectrumConstructor._func` for each value.
+        Redefine it in actual classes to evaluate the whole array in one
+        call; results should be equal to the per-point function.
+
+        :param values: x values (wavelengths)
+        :type values: array of float
+
+        :return: intensity values
+        :rtype: iterable of float
         """
-        for v in values:
-            yield v, cls._func(v, *args)
+        return (cls._func(v, *args) for v in values)
+
+    @classmethod
+    def _grid_config(cls, grid=None, spectrum_range=None):
+        """Private method returning complete grid config for a call.
+
+        Values are taken from `grid` first, then from `spectrum_range`
+        computed by the constructor and then from class defaults.
+        """
+        if grid is None:
+            grid = GridConfig()
+        return GridConfig(
+            grid.spectrum_range or spectrum_range or cls._spectrum_range,
+            grid.precision or cls._precision,
+            cls.progressive_scale if grid.progressive_scale is None
+            else grid.progressive_scale)
 
     @classproperty
     def _wavelist(cls):
         """Private class property returning list of bands (wavelengths)
         i.e. x axis values.
         """
-
-        def _create_progressive_division():
-            k = dw / sum((range(cls._precision)))
-            s = w_min
-            for i in range(cls._precision):
-                s += k * i
-                yield s
-
-        w_min, w_max = cls._spectrum_range
-        dw = w_max - w_min
-        if cls.progressive_scale:
-            waves = _create_progressive_division()
-        else:
-            step = dw / cls._precision
-            waves = (w_min + step * i for i in range(cls._precision))
-        return waves
+        return _create_wavelist(
+            cls._spectrum_range, cls._precision, cls.progressive_scale)
 
     @staticmethod
-    def __new__(cls, *args):
+    def __new__(cls, *args, grid=None):
         """Constructs and returns :class:`Spectrum` instance.
         """
-        lines = list(cls._return_spectrum(cls._wavelist, *args))
-        return cls._spectrum_type(lines)
+        waves = cls._grid_config(grid).wavelist
+        intensities = array('d', cls._func_many(waves, *args))
+        return cls._spectrum_type._wrap(waves, intensities, 'point')
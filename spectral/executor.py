@@ -0,0 +1,193 @@
+"""This module provides a pluggable execution layer for heavy per-point
+spectral computations, such as :func:`spectral.spectrum.Spectrum.resample`
+and :class:`spectral.filter.SpectrumFilter` processing.
+
+Work is split into a few large chunks which are sent to an executor, so the
+cost of transport doesn't grow with the number of points. Inputs smaller than
+:data:`PARALLEL_THRESHOLD` points are always processed serially in the calling
+thread, because starting the work in another process costs more than the
+work itself. Arrays placed in shared memory (see :py:mod:`spectral.shared`)
+are sent to process executors as handles without copying their data.
+
+An executor may be one of:
+    - 'serial' - no parallelism at all.
+    - 'thread' - a shared :class:`concurrent.futures.ThreadPoolExecutor`.
+    - 'process' - a shared :class:`concurrent.futures.ProcessPoolExecutor`
+      (used by default, created on first use and reused across calls).
+    - any :class:`concurrent.futures.Executor` instance provided by user.
+
+**Example**:
+::
+
+    >>>from concurrent.futures import ThreadPoolExecutor
+    >>>from spectral import executor
+    >>>executor.set_executor('serial')
+    >>>with ThreadPoolExecutor(2) as pool, executor.using_executor(pool):
+    ...    spectrum.resample(other)
+
+"""
+
+import os
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import chain, repeat
+from multiprocessing import resource_tracker
+
+from .shared import resolving, transportable
+
+PARALLEL_THRESHOLD = 100000
+"""Minimal number of points processed with an executor."""
+
+
+_factories = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+_default = 'process'
+_shared = None
+_override = ContextVar('spectral_executor', default=None)
+
+
+def _check(executor):
+    """Private function validating executor name or instance.
+
+    :raises ValueError: if executor name is not known
+    """
+    if not isinstance(executor, Executor) and executor != 'serial' and \
+            executor not in _factories:
+        raise ValueError(
+            "Executor should be an Executor instance or one of these: "
+            "serial, %s" % ', '.join(_factories))
+
+
+def set_executor(executor):
+    """Sets the default executor. A shared executor created previously by
+    name is shut down.
+
+    :param executor: executor name or instance
+    :type executor: str, concurrent.futures.Executor
+
+    :raises ValueError: if executor name is not known
+    """
+    global _default, _shared
+    _check(executor)
+    if _shared is not None:
+        _shared.shutdown()
+        _shared = None
+    _default = executor
+
+
+def get_executor():
+    """Returns the current executor, creating a shared one on first use if
+    needed.
+
+    :return: executor or None for serial execution
+    :rtype: concurrent.futures.Executor, None
+    """
+    global _shared
+    executor = _override.get() or _default
+    if executor == 'serial':
+        return None
+    if isinstance(executor, str):
+        if _shared is None:
+            _shared = _factories[executor]()
+        executor = _shared
+    if isinstance(executor, ProcessPoolExecutor) and os.name == 'posix':
+        # workers are started on first use, so they share the tracker with
+        # this process and don't unlink shared memory blocks they map
+        resource_tracker.ensure_running()
+    return executor
+
+
+@contextmanager
+def using_executor(executor):
+    """Context manager using a given executor in the current context.
+
+    If executor name is provided, a new executor is created and shut down on
+    exit. Executor instances are not shut down.
+
+    :param executor: executor name or instance
+    :type executor: str, concurrent.futures.Executor
+
+    :raises ValueError: if executor name is not known
+    """
+    _check(executor)
+    owned = executor in _factories
+    if owned:
+        executor = _factories[executor]()
+    token = _override.set(executor)
+    try:
+        yield None if executor == 'serial' else executor
+    finally:
+        _override.reset(token)
+        if owned:
+            executor.shutdown()
+
+
+def is_parallel(n, threshold=None):
+    """Checks whether :func:`map_chunks` would use an executor for a given
+    number of items.
+
+    :param n: number of items
+    :type n: int
+    :param threshold: minimal number of items for an executor,
+        :data:`PARALLEL_THRESHOLD` if None
+    :type threshold: int, None
+    :rtype: bool
+    """
+    if threshold is None:
+        threshold = PARALLEL_THRESHOLD
+    return n >= threshold and get_executor() is not None
+
+
+def map_chunks(func, items, *args, threshold=None):
+    """Applies a function to chunks of items and returns concatenated
+    results.
+
+    `func(chunk, *args)` should return an iterable with one result for each
+    item of the chunk. If items are fewer than threshold, the function is
+    called once in the current thread with all items.
+
+    Memoryviews of shared arrays (see :py:mod:`spectral.shared`) in items
+    and arguments are sent to executors as handles, other memoryviews are
+    copied.
+
+    :param func: function, must be picklable for process executors
+    :type func: callable
+    :param items: sequence of items, which supports slicing
+    :type items: sequence
+    :param args: additional arguments passed to every call
+    :param threshold: minimal number of items for an executor,
+        :data:`PARALLEL_THRESHOLD` if None
+    :type threshold: int, None
+
+    :return: results for all items
+    :rtype: list
+    """
+    if threshold is None:
+        threshold = PARALLEL_THRESHOLD
+    n = len(items)
+    executor = get_executor() if n >= threshold else None
+    if executor is None:
+        return list(func(items, *args))
+    size = -(-n // (4 * (os.cpu_count() or 1)))
+    chunks = (_slice(items, i, i + size) for i in range(0, n, size))
+    args = map(repeat, map(transportable, args))
+    results = executor.map(_run_chunk, repeat(func), chunks, *args)
+    return list(chain.from_iterable(results))
+
+
+def _slice(items, i, j):
+    """Private function slicing items, memoryviews are replaced with
+    picklable values."""
+    return transportable(items[i:j])
+
+
+def _run_chunk(func, chunk, *args):
+    """Private function calling a function for a chunk. Shared arrays are
+    mapped for the call and closed after it, see
+    :func:`spectral.shared.resolving`."""
+    with resolving((chunk,) + args) as values:
+        return func(*values)
@@ -1,11 +1,167 @@
 """Provides abstract base class
 :class:`spectral.filter.SpectrumFilter` for spectral data manipulations.
+
+Filters which only attenuate intensities (the result is the intensity
+multiplied by a factor depending on x value and filter parameters) may
+provide a :class:`TransmissionCurve`. Curves are computed once per grid and
+filter parameters and cached, so filtering many spectra with the same
+parameters costs a single multiplication per spectrum. Several such filters
+may be fused into one curve with :class:`FilterChain`.
+
+**Example**:
+::
+
+    >>>from spectral.filter import FilterChain
+    >>>from spectral.blackbody import RayleighFilter, PhotoAbsoprtion
+    >>>atmosphere = FilterChain(
+    ...    (RayleighFilter, (mat_abundances, molecules, temperature)),
+    ...    (PhotoAbsoprtion, (mat_abundances, molecules, temperature)))
+    >>>filtered = [atmosphere.apply(s) for s in spectra]
+
 """
 
-from itertools import repeat
-from multiprocessing.pool import Pool
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import cycle, repeat
+from operator import mul
+
+from spectral import shared
+from spectral.batch import SpectrumBatch
+from spectral.executor import is_parallel, map_chunks
+from spectral.spectrum import Spectrum, _as_float_array
+
+
+def _process_chunk(points, func, args):
+    """Private function applying a filter function to a chunk of
+    (spectrum point, filter point) pairs.
+    """
+    return [func(p, f, args) for p, f in points]
+
+
+def _process_shared_chunk(indexes, func, x, y, filter_y, args, out):
+    """Private function applying a filter function to a range of spectrum
+    points and writing results into a shared array.
+    """
+    for i in indexes:
+        f = None if filter_y is None else (x[i], filter_y[i])
+        out[i] = func((x[i], y[i]), f, args)
+    return ()
+
+
+def _freeze(value):
+    """Private function converting lists in filter parameters to tuples to
+    make them hashable."""
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_freeze, value))
+    return value
+
+
+class _Identity:
+    """Private hashable wrapper comparing objects by identity."""
+    __slots__ = ('obj',)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __hash__(self):
+        return id(self.obj)
+
+    def __eq__(self, other):
+        return self.obj is other.obj
+
 
-from spectral.spectrum import Spectrum
+@lru_cache(maxsize=64)
+def _identity_grid_key(grid):
+    """Private function returning bytes of a grid wrapped in
+    :class:`_Identity`. Cached grids stay referenced, so their ids are not
+    reused."""
+    return bytes(grid.obj)
+
+
+def _grid_key(x_values):
+    """Private function returning bytes of a float64 grid as a cache key.
+
+    Read-only grids (such as grids of constructed spectra, which are shared
+    between spectra) are looked up by identity first, so their values are
+    copied only once.
+    """
+    if isinstance(x_values, memoryview) and x_values.readonly and \
+            x_values.format == 'd':
+        return _identity_grid_key(_Identity(x_values))
+    return bytes(_as_float_array(x_values))
+
+
+@lru_cache(maxsize=64)
+def _cached_transmission_curve(cls, grid, args):
+    """Private function computing transmission curves with LRU eviction.
+    The grid is passed as bytes of a float64 array.
+    """
+    x = array('d')
+    x.frombytes(grid)
+    return TransmissionCurve(x, cls._transmission(x, args))
+
+
+class TransmissionCurve:
+    """Transmission (attenuation factor) of a filter on a fixed grid.
+
+    Applying a curve multiplies intensities by transmission values
+    point by point.
+
+    :param x_values: sorted x values (grid)
+    :type x_values: array, iterable of float
+    :param transmission: attenuation factors for each x value
+    :type transmission: array, iterable of float
+
+    :raises ValueError: if lengths of x values and transmission do not match
+    """
+
+    def __init__(self, x_values, transmission):
+        self._x = _as_float_array(x_values)
+        self._t = _as_float_array(transmission)
+        if len(self._x) != len(self._t):
+            raise ValueError(
+                "Lengths of x values and transmission do not match: %d != %d"
+                % (len(self._x), len(self._t)))
+
+    @property
+    def x_values(self):
+        """Read-only view of the grid.
+
+        :rtype: memoryview of float
+        """
+        return memoryview(self._x).toreadonly()
+
+    @property
+    def transmission(self):
+        """Read-only view of the attenuation factors.
+
+        :rtype: memoryview of float
+        """
+        return memoryview(self._t).toreadonly()
+
+    def apply(self, spectrum):
+        """Applies the curve to a spectrum or to every spectrum of a batch.
+
+        :param spectrum: spectrum or batch on the same grid
+        :type spectrum: Spectrum, SpectrumBatch
+
+        :return: filtered spectrum or batch
+        :rtype: Spectrum, SpectrumBatch
+
+        :raises ValueError: if x values do not match
+        """
+        if spectrum._x is not self._x and spectrum._x != self._x:
+            raise ValueError("Spectral lines of the spectrum do not match "
+                             "the transmission curve.")
+        if isinstance(spectrum, SpectrumBatch):
+            return spectrum._wrap(
+                spectrum._x, array('d', map(mul, spectrum._data,
+                                            cycle(self._t))),
+                spectrum.spectrum_type, spectrum.interpolation)
+        return spectrum._wrap(spectrum._x,
+                              array('d', map(mul, spectrum._y, self._t)),
+                              spectrum.interpolation)
 
 
 class SpectrumFilter:
@@ -15,17 +171,19 @@ class SpectrumFilter:
     Spectrum instance with modified data.
 
     If filter_spectrum is provided, then at first it will resample filter
-    spectrum to match the processing spectrum. Then it will send spectrum
-    data points to a multiprocessing pool to be modified by
-    :func:`SpectrumFilter._func` with related filter points as first argument
-    and rest of args as the second argument. Then args will be umpacked the
-    way programmer defined it in the function. Returned data will be combined
-    into a new spectrum and send back as a return value.
+    spectrum to match the processing spectrum. Then it will send chunks of
+    spectrum data points to an executor (see :py:mod:`spectral.executor`) to
+    be modified by :func:`SpectrumFilter._func` with related filter points as
+    first argument and rest of args as the second argument. Then args will be
+    umpacked the way programmer defined it in the function. Returned data will
+    be combined into a new spectrum and send back as a return value.
 
     See _func docstring for more info.
 
     :func:`SpectrumFilter._func` actually is the only method to be redefined in
-    derived classes.
+    derived classes. Derived classes may also define
+    :func:`SpectrumFilter._func_array` which processes all points at once;
+    it is preferred over the per-point function when present.
 
     :param spectrum: spectrum to be processed
     :type spectrum: Spectrum
@@ -65,6 +223,57 @@ class SpectrumFilter:
             "Trying to call abstract class function.")
         return float()
 
+    _func_array = None
+    """Optional private array-level function to be defined in actual classes
+    as a static method: `_func_array(x, y, filter_y, args)`.
+
+    It receives all x values and intensities of a spectrum, intensities of
+    the resampled filter spectrum (or None) and the list of additional
+    parameters, and returns an iterable of new intensities. It should give
+    the same result as :func:`SpectrumFilter._func` applied to each point.
+    """
+
+    _transmission = None
+    """Optional private function to be defined in actual classes as a static
+    method: `_transmission(x, args)`.
+
+    It is defined for filters which don't use a filter spectrum and only
+    multiply intensities by a factor independent of them. It receives x
+    values and the list of additional parameters and returns an iterable of
+    attenuation factors. It is preferred over other functions when present,
+    see :func:`SpectrumFilter.transmission_curve`.
+    """
+
+    @classmethod
+    def transmission_curve(cls, x_values, *args):
+        """Returns a transmission curve of the filter for a given grid and
+        parameters.
+
+        Curves are cached with LRU eviction by grid values and parameters,
+        so materials and other parameter objects should not change after
+        they were used. Curves for unhashable parameters are not cached.
+
+        :param x_values: sorted x values (grid)
+        :type x_values: array, iterable of float
+        :param args: filter parameters
+
+        :return: transmission curve
+        :rtype: TransmissionCurve
+
+        :raises NotImplementedError: if the filter doesn't provide
+            `_transmission` function
+        """
+        if cls._transmission is None:
+            raise NotImplementedError(
+                "%s doesn't provide a transmission curve." % cls.__name__)
+        frozen = _freeze(args)
+        try:
+            hash(frozen)
+        except TypeError:
+            x = _as_float_array(x_values)
+            return TransmissionCurve(x, cls._transmission(x, args))
+        return _cached_transmission_curve(cls, _grid_key(x_values), frozen)
+
     @classmethod
     def _process(cls, spectrum, filter_spectrum, *args):
         """This private class method process spectrum with a given filter
@@ -73,22 +282,112 @@ class SpectrumFilter:
         .. note:: If no filter spectrum is provided, then it passes None as
                   filter spectrum point to all processes.
 
-        This method uses multiprocessing.
+        If :func:`SpectrumFilter._transmission` is defined and there is no
+        filter spectrum, a cached transmission curve is applied. If
+        :func:`SpectrumFilter._func_array` is defined, it is called once for
+        the whole spectrum. Otherwise large spectra are processed point by
+        point in chunks with the current executor, see
+        :py:mod:`spectral.executor`. Spectra in shared memory (see
+        :py:mod:`spectral.shared`) are sent to workers as handles of their
+        arrays.
         """
+        if cls._transmission is not None and not filter_spectrum:
+            return cls.transmission_curve(spectrum._x, *args).apply(spectrum)
+        if cls._func_array is not None:
+            filter_y = None
+            if filter_spectrum:
+                filter_y = filter_spectrum.resample(spectrum)._y
+            y_values = cls._func_array(
+                spectrum._x, spectrum._y, filter_y, args)
+            return spectrum._wrap(spectrum._x, array('d', y_values),
+                                  spectrum.interpolation)
+        n = len(spectrum._x)
+        if is_parallel(n) and shared.is_shared(spectrum):
+            buffers = [n]
+            if filter_spectrum:
+                buffers.append(filter_spectrum.resample(spectrum)._y)
+            with shared.temporary(*buffers) as views:
+                filter_y = views[1] if filter_spectrum else None
+                map_chunks(_process_shared_chunk, range(n), cls._func,
+                           spectrum._x, spectrum._y, filter_y, args,
+                           views[0])
+                y_values = array('d', views[0])
+            return spectrum._wrap(spectrum._x, y_values,
+                                  spectrum.interpolation)
         if filter_spectrum:
             resampled_filter_spectrum = filter_spectrum.resample(spectrum)
             resampled_filter_lines = resampled_filter_spectrum.lines
         else:
-            resampled_filter_lines = repeat(None, len(spectrum.lines))
-        data = zip(spectrum.lines, resampled_filter_lines, repeat(args))
-        p = Pool()
-        y_values = p.starmap(cls._func, data)
-        p.close()
-        p.join()
-        lines = zip(spectrum.x_values, y_values)
-        return type(spectrum)(lines, interpolation=spectrum.interpolation)
+            resampled_filter_lines = repeat(None)
+        points = tuple(zip(spectrum.lines, resampled_filter_lines))
+        y_values = map_chunks(_process_chunk, points, cls._func, args)
+        return spectrum._wrap(spectrum._x, array('d', y_values),
+                              spectrum.interpolation)
 
     @staticmethod
     def __new__(cls, spectrum, filter_spectrum=None, *args):
         spectrum = cls._process(spectrum, filter_spectrum, *args)
         return spectrum
+
+
+class FilterChain:
+    """Sequence of filters applied as a single transmission curve.
+
+    Transmissions of all filters are multiplied into one curve (which is the
+    same as summing their optical depths), so the whole chain is applied with
+    one multiplication and one allocation per spectrum. Fused curves are
+    cached per grid in the chain instance, reuse the chain for a stream of
+    spectra.
+
+    :param filters: pairs of a filter class providing a transmission curve
+        (see :func:`SpectrumFilter.transmission_curve`) and its parameters
+    :type filters: (type, tuple)
+
+    :raises TypeError: if a filter doesn't provide a transmission curve
+    """
+    max_cached_grids = 16
+
+    def __init__(self, *filters):
+        for f, args in filters:
+            if getattr(f, '_transmission', None) is None:
+                raise TypeError(
+                    "%s doesn't provide a transmission curve." % f.__name__)
+        self.filters = tuple((f, tuple(args)) for f, args in filters)
+        self._curves = OrderedDict()
+
+    def transmission_curve(self, x_values):
+        """Returns the fused transmission curve for a given grid.
+
+        :param x_values: sorted x values (grid)
+        :type x_values: array, iterable of float
+
+        :return: transmission curve
+        :rtype: TransmissionCurve
+        """
+        key = _grid_key(x_values)
+        curve = self._curves.get(key)
+        if curve is None:
+            x = _as_float_array(x_values)
+            transmission = array('d', repeat(1., len(x)))
+            for f, args in self.filters:
+                t = f.transmission_curve(x, *args)._t
+                transmission = array('d', map(mul, transmission, t))
+            curve = TransmissionCurve(x, transmission)
+            self._curves[key] = curve
+            if len(self._curves) > self.max_cached_grids:
+                self._curves.popitem(last=False)
+        else:
+            self._curves.move_to_end(key)
+        return curve
+
+    def apply(self, spectrum):
+        """Applies all filters of the chain to a spectrum or to every
+        spectrum of a batch.
+
+        :param spectrum: spectrum or batch
+        :type spectrum: Spectrum, SpectrumBatch
+
+        :return: filtered spectrum or batch
+        :rtype: Spectrum, SpectrumBatch
+        """
+        return self.transmission_curve(spectrum._x).apply(spectrum)
@@ -1,27 +1,42 @@
 """This module provides interpolation some basic algorithms.
 
-Available methods are: line, none and point. Line is the linear interpolation,
-point is the point sampling, none means that no interpolation at all will be
-performed and the first value greater than x will be returned.
+Available methods are: line, none, point, cos and cubic. Line is the linear
+interpolation, point is the point sampling, none means that no interpolation at
+all will be performed and the first value greater than x will be returned.
+Cos is the cosine interpolation and cubic is the natural cubic spline
+interpolation.
+
+:class:`Interpolation` provides static functions working with any sorted
+sequence of (x, y) pairs. :class:`Interpolator` is built once for a fixed data
+set and precomputes per-segment coefficients, so each query is a binary search
+and a polynomial evaluation.
 
 **Example**:
 ::
 
     >>>from spectral.interpolation import Interpolation
     >>>Interpolation.available_methods
-    ('line', 'none', 'point')
+    ('none', 'point', 'line', 'cos', 'cubic')
     >>>data = [(0, 53.2), (4.1, 24.3), (5.2, -41), (51, 8.0)]
     >>>x = 3.1
     >>>Interpolation.interpolate(data, x, method='line')
     31.348780487804877
+    >>>Interpolator(*zip(*data), method='line')(x)
+    31.348780487804877
 
 """
 
 import functools
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, islice
+from operator import itemgetter, sub, truediv
 
 from tools.classproperty import classproperty
 
 _methods = dict()
+_x_key = itemgetter(0)
 
 
 def _register_interpolation_function(f):
@@ -31,7 +46,7 @@ def _register_interpolation_function(f):
 
     @functools.wraps(f)
     def wrapper(*args):
-        return f.__func__(*args)
+        return f(*args)
 
     return wrapper
 
@@ -41,13 +56,18 @@ class Interpolation:
 
     Should not be instantiated.
 
-    To use this call :func:`Interpolation.interpolate` method with arguments.
+    To use this call :func:`Interpolation.interpolate` method with arguments,
+    or :func:`Interpolation.interpolate_many` for a sequence of points.
 
     To register new interpolation method :func:`_interpolation_function`
     module scope decorator is used. The decorator insures, that the method will
     be listed in `Interpolation.methods` dict and in module `_methods` dict.
+    Registered functions receive the data, index *i* of the first point not
+    less than *x* and *x* itself; off-range points and exact matches are
+    resolved before they are called.
+
+    For repeated queries against the same data use :class:`Interpolator`.
     """
-    # TODO: add cubic and cos algorithms
     _methods = _methods
 
     @classproperty
@@ -71,10 +91,9 @@ class Interpolation:
         .. warning:: List of given points should be sorted from smaller to
                      greater *x* numbers.
 
-        .. note:: Interpolation adds startpoint and endpoint to data provided
-                  with (-Inf, data[0][1]) and (Inf, data[-1][1]) otherwise
-                  off-range values calculation would cause errors.
-                  It doesn't modify the data source.
+        .. note:: Off-range points get the value of the nearest data point,
+                  i.e. data is treated as if it had (-Inf, data[0][1]) and
+                  (Inf, data[-1][1]) endpoints. The data is not copied.
 
         :param values: list of (x, y) pairs
         :type values: list, tuple of (numeric, numeric)
@@ -94,9 +113,32 @@ class Interpolation:
                     that it doesn't determine which point of the data is closer
                     to a provided *x*.
 
-        :return: y value for given x, if None is returned, than the problem is
-            likely to be in provided data.
-        :rtype: float, int, None
+        :return: y value for given x
+        :rtype: float, int
+
+        :raises ValueError: if interpolation method is not registered
+        in the class.
+        """
+        return cls.interpolate_many(values, (x,), method)[0]
+
+    @classmethod
+    def interpolate_many(cls, values, xs, method='none'):
+        """Returns function values for a sequence of points.
+
+        Each point is located in the data with a binary search, so a single
+        lookup costs O(log n) and the data is never copied.
+        See :func:`Interpolation.interpolate` for parameters description.
+
+        :param values: sorted sequence of (x, y) pairs, for example
+            :attr:`spectral.spectrum.Spectrum.lines`
+        :type values: sequence of (numeric, numeric)
+        :param xs: points where a function need to be calculated
+        :type xs: iterable of float
+        :param method: default is 'none', interpolation method
+        :type method: str
+
+        :return: y values for given points
+        :rtype: list of float
 
         :raises ValueError: if interpolation method is not registered
         in the class.
@@ -106,59 +148,431 @@ class Interpolation:
                 "%s interpolation method not available."
                 "Should be one of these: %s"
                 % (method, ', '.join(cls.available_methods)))
-        values = cls._add_endpoints(values)
-        return cls._methods[method](values, x)
+        if method == 'cubic':
+            # the spline is global, solve it once for all points
+            x_values, y_values = zip(*values)
+            return Interpolator(x_values, y_values, method).many(xs)
+        f = cls._methods[method]
+        n = len(values)
+        result = []
+        for x in xs:
+            i = bisect_left(values, x, key=_x_key)
+            if i == n:
+                y = values[-1][1]
+            elif i == 0 or values[i][0] == x:
+                y = values[i][1]
+            else:
+                y = f(values, i, x)
+            result.append(y)
+        return result
 
     @staticmethod
-    def _add_endpoints(values):
-        """Private method which adds -Inf and Inf points to a provided dataset.
+    @_register_interpolation_function
+    def none(values, i, x):
+        """Basic interpolation method (no interpolation).
+
+        :param values: sorted sequence of (x, y) pairs
+        :param i: index of the first point with x coordinate >= *x*,
+            0 < i < len(values)
+        :param x: point where a function need to be calculated
         """
-        return [(float('-Inf'), values[0][1]), *values,
-                (float('Inf'), values[-1][1])]
+        return values[i][1]
 
     @staticmethod
     @_register_interpolation_function
-    def none(values, x):
-        """Basic interpolation method (no interpolation).
+    def point(values, i, x):
+        """Point sampling. Points exactly in the middle of a segment get
+        the value of the right point.
         """
-        y1 = None
-        for i in range(1, len(values) + 1):
-            x1, y1 = values[i]
-            if x > x1:
-                continue
-            break
-        return y1
+        (x0, y0), (x1, y1) = values[i - 1], values[i]
+        if x >= x0 + 0.5 * (x1 - x0):
+            return y1
+        return y0
 
     @staticmethod
     @_register_interpolation_function
-    def point(values, x):
-        """Point sampling.
-        """
-        for n, (x1, y1) in enumerate(values[1:]):
-            x0, y0 = values[n]
-            if x > x1:
-                continue
-            if x1 - x <= x - x0:
-                y = y1
-            else:
-                y = y0
-            return y
-        else:
-            return None
+    def line(values, i, x):
+        """Linear interpolation.
+        """
+        (x0, y0), (x1, y1) = values[i - 1], values[i]
+        if y0 == y1:
+            return y0
+        return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
 
     @staticmethod
     @_register_interpolation_function
-    def line(values, x):
-        """Linear interpolation.
+    def cos(values, i, x):
+        """Cosine interpolation. Smooth in every data point, but the
+        derivative is always zero there.
         """
-        for n, (x1, y1) in enumerate(values[1:]):
-            x0, y0 = values[n]
-            if x > x1:
-                continue
-            if y0 == y1:
-                return y0
-            else:
-                y = y0 + (y1 - y0) * (x - x0) / (x1 - x0)
-                return y
-        else:
-            return None
+        (x0, y0), (x1, y1) = values[i - 1], values[i]
+        mu = (1. - math.cos(math.pi * (x - x0) / (x1 - x0))) * 0.5
+        return y0 + (y1 - y0) * mu
+
+    @staticmethod
+    @_register_interpolation_function
+    def cubic(values, i, x):
+        """Natural cubic spline interpolation. Uses actual x spacing, the
+        second derivative is zero at the data borders.
+
+        The spline is global: second derivatives in all data points are
+        solved from a tridiagonal system, so a single call costs O(n).
+        :func:`Interpolation.interpolate_many` and :class:`Interpolator`
+        solve it once for all points.
+        """
+        x_values, y_values = zip(*values)
+        return Interpolator(x_values, y_values, 'cubic')._evaluate_cubic(i, x)
+
+
+def _natural_spline(dx, rhs):
+    """Private function solving the natural cubic spline system
+    ``dx[i-1]*m[i-1] + 2*(dx[i-1] + dx[i])*m[i] + dx[i]*m[i+1] = rhs[i]``
+    for interior points with the Thomas algorithm.
+
+    :return: solution for all points, border values are zero
+    :rtype: array of float
+    """
+    n = len(dx) + 1
+    m = array('d', bytes(8 * n))
+    c, d = array('d', m), array('d', m)
+    for i in range(1, n - 1):
+        b = 2. * (dx[i - 1] + dx[i]) - dx[i - 1] * c[i - 1]
+        c[i] = dx[i] / b
+        d[i] = (rhs[i] - dx[i - 1] * d[i - 1]) / b
+    for i in range(n - 2, 0, -1):
+        m[i] = d[i] - c[i] * m[i + 1]
+    return m
+
+
+def _spline_moments(u):
+    """Private function returning coefficients of the segment second
+    derivatives in the integral of a spline segment over its first *u*
+    part, in units of the segment length cubed.
+    """
+    u2 = u * u
+    u4 = u2 * u2
+    return (u2 * u - u2 - 0.25 * u4) / 6., (0.25 * u4 - 0.5 * u2) / 6.
+
+
+def _check_increasing(dx):
+    """Private function checking that x values are strictly increasing.
+
+    :raises ValueError: if there are equal or unsorted x values
+    """
+    for k, d in enumerate(dx):
+        if not d > 0.:
+            raise ValueError("X values must be strictly increasing, got "
+                             "x[%d] >= x[%d]" % (k, k + 1))
+
+
+class Interpolator:
+    """Interpolator prepared for a fixed data set.
+
+    All coefficients the method needs are computed once on construction:
+    segment slopes for 'line', midpoints for 'point', value differences for
+    'cos' and spline polynomial coefficients for 'cubic' (second derivatives
+    are solved from the natural spline system once). A query is then a binary
+    search and an evaluation of a small polynomial. Results match
+    :func:`Interpolation.interpolate` up to floating point rounding.
+
+    Interpolator instances are callable and also provide exact integration
+    of the interpolated function, see :func:`Interpolator.integrate`.
+    Methods registered in :class:`Interpolation` by users are supported too,
+    though without precomputation.
+
+    .. warning:: The data is not copied, it must not be modified while the
+                 interpolator is in use.
+
+    :param x_values: sorted x values
+    :type x_values: array, sequence of float
+    :param y_values: y values
+    :type y_values: array, sequence of float
+    :param method: default is 'point', interpolation method name
+    :type method: str
+
+    :raises ValueError: if interpolation method is not registered in
+        :class:`Interpolation`, data is empty or x values are not strictly
+        increasing for 'line' and 'cubic' methods.
+    """
+
+    def __init__(self, x_values, y_values, method='point'):
+        if method not in Interpolation._methods:
+            raise ValueError(
+                "%s interpolation method not available."
+                "Should be one of these: %s"
+                % (method, ', '.join(Interpolation.available_methods)))
+        if not len(x_values):
+            raise ValueError("Can't interpolate an empty data set.")
+        self._x, self._y = x_values, y_values
+        self.method = method
+        x, y = x_values, y_values
+        self._dx = array('d', map(sub, islice(x, 1, None), x))
+        self._dy = array('d', map(sub, islice(y, 1, None), y))
+        self._cumulative = None
+        self._m = None
+        self._integral = getattr(
+            self, '_integral_' + method, self._integral_line)
+        self._evaluate = getattr(self, '_evaluate_' + method, None)
+        if self._evaluate is None:
+            self._lines = tuple(zip(x, y))
+            self._evaluate = self._evaluate_registered
+        elif hasattr(self, '_prepare_' + method):
+            getattr(self, '_prepare_' + method)()
+
+    def __call__(self, x):
+        """Returns interpolated value in a given point.
+
+        :param x: coordinate
+        :type x: float
+
+        :return: value
+        :rtype: float
+        """
+        i = bisect_left(self._x, x)
+        if i == len(self._x):
+            return self._y[-1]
+        if i == 0 or self._x[i] == x:
+            return self._y[i]
+        return self._evaluate(i, x)
+
+    def many(self, xs):
+        """Returns interpolated values in given points.
+
+        :param xs: coordinates
+        :type xs: iterable of float
+
+        :return: values
+        :rtype: list of float
+        """
+        return list(map(self, xs))
+
+    def antiderivative(self, x):
+        """Returns the integral of the interpolated function from the first
+        data point to *x*. Integration range is clamped to the data range.
+
+        The integral is exact for the interpolation method: per-segment
+        integrals are computed in closed form and summed into a cumulative
+        array once, so each call is a binary search and a partial segment
+        evaluation. Methods registered by users are integrated with the
+        trapezoid rule.
+
+        :param x: coordinate
+        :type x: float
+
+        :return: integral value
+        :rtype: float
+        """
+        k = bisect_right(self._x, x) - 1
+        if k < 0:
+            return 0.
+        cumulative = self.cumulative
+        if k >= len(self._dx):
+            return cumulative[-1]
+        return cumulative[k] + self._segment_integral(
+            k, (x - self._x[k]) / self._dx[k])
+
+    def integrate(self, x0=None, x1=None):
+        """Integrates the interpolated function in a specified range.
+
+        :param x0: bottom border, first data point if None
+        :type x0: float, None
+        :param x1: top border, last data point if None
+        :type x1: float, None
+
+        :return: integral value
+        :rtype: float
+
+        :raises ValueError: if x0 > x1
+        """
+        if x0 is None:
+            x0 = self._x[0]
+        if x1 is None:
+            x1 = self._x[-1]
+        if x0 > x1:
+            raise ValueError(
+                "Range must be valid, got x0 > x1, %f > %f" % (x0, x1))
+        return self.antiderivative(x1) - self.antiderivative(x0)
+
+    @classmethod
+    def integration_weights(cls, x_values, method='point', x0=None,
+                            x1=None):
+        """Returns integration weights for a grid.
+
+        All interpolation methods are linear in y values, so an integral over
+        a fixed range is a weighted sum of y values. The weights depend only
+        on the grid, the method and the range; they may be computed once and
+        applied to many data sets sharing the grid:
+        ``sum(map(operator.mul, weights, y_values))``.
+
+        See :func:`Interpolator.integrate` for parameters description.
+
+        :param x_values: sorted x values
+        :type x_values: array, sequence of float
+        :param method: default is 'point', interpolation method name
+        :type method: str
+
+        :return: weights for each x value
+        :rtype: array of float
+
+        :raises ValueError: if x0 > x1
+        """
+        n = len(x_values)
+        if x0 is None:
+            x0 = x_values[0]
+        if x1 is None:
+            x1 = x_values[-1]
+        if x0 > x1:
+            raise ValueError(
+                "Range must be valid, got x0 > x1, %f > %f" % (x0, x1))
+        integral = getattr(cls, '_integral_' + method, cls._integral_line)
+        weights = array('d', bytes(8 * n))
+        # integral coefficients of spline second derivatives
+        moments = array('d', weights) if method == 'cubic' else None
+
+        def add(k, u, sign):
+            dx = (x_values[k + 1] - x_values[k]) * sign
+            indices = (max(k - 1, 0), k, k + 1, min(k + 2, n - 1))
+            for j, c in zip(indices, integral(u)):
+                weights[j] += c * dx
+            if moments is not None:
+                d0, d1 = _spline_moments(u)
+                dx3 = dx * (x_values[k + 1] - x_values[k]) ** 2
+                moments[k] += d0 * dx3
+                moments[k + 1] += d1 * dx3
+
+        def locate(x):
+            k = bisect_right(x_values, x) - 1
+            if k < 0:
+                return 0, 0.
+            if k >= n - 1:
+                return n - 1, 0.
+            return k, (x - x_values[k]) / (x_values[k + 1] - x_values[k])
+
+        (k0, u0), (k1, u1) = locate(x0), locate(x1)
+        for k in range(k0, k1):
+            add(k, 1., 1.)
+        if u1:
+            add(k1, u1, 1.)
+        if u0:
+            add(k0, u0, -1.)
+        if moments is not None:
+            cls._add_spline_weights(weights, x_values, moments)
+        return weights
+
+    @staticmethod
+    def _add_spline_weights(weights, x_values, moments):
+        """Private method adding contribution of second derivatives to
+        cubic spline integration weights.
+
+        Second derivatives are ``A^-1 B y``, where A is the symmetric spline
+        system matrix and B y its right side, so their contribution is
+        ``B^T A^-1 moments``.
+
+        :raises ValueError: if x values are not strictly increasing
+        """
+        dx = array('d', map(sub, islice(x_values, 1, None), x_values))
+        _check_increasing(dx)
+        z = _natural_spline(dx, moments)
+        for i in range(1, len(dx)):
+            a, b = 6. * z[i] / dx[i - 1], 6. * z[i] / dx[i]
+            weights[i - 1] += a
+            weights[i] -= a + b
+            weights[i + 1] += b
+
+    @property
+    def cumulative(self):
+        """Cumulative integral in the data points, i.e. antiderivative values
+        for each x value. It is built on first access.
+
+        :rtype: array of float
+        """
+        if self._cumulative is None:
+            y, n = self._y, len(self._y)
+            cm, c0, c1, c2 = self._integral(1.)
+            segments = (dx * (cm * y[max(k - 1, 0)] + c0 * y[k] +
+                              c1 * y[k + 1] + c2 * y[min(k + 2, n - 1)])
+                        for k, dx in enumerate(self._dx))
+            if self._m is not None:
+                m, (d0, d1) = self._m, _spline_moments(1.)
+                segments = (s + dx ** 3 * (d0 * m[k] + d1 * m[k + 1])
+                            for k, (s, dx) in enumerate(zip(segments,
+                                                            self._dx)))
+            self._cumulative = array('d', accumulate(segments, initial=0.))
+        return self._cumulative
+
+    def _segment_integral(self, k, u):
+        """Private method returning integral over the first *u* part of
+        segment *k*.
+        """
+        y, n = self._y, len(self._y)
+        cm, c0, c1, c2 = self._integral(u)
+        dx = self._dx[k]
+        result = dx * (cm * y[max(k - 1, 0)] + c0 * y[k] +
+                       c1 * y[k + 1] + c2 * y[min(k + 2, n - 1)])
+        if self._m is not None:
+            d0, d1 = _spline_moments(u)
+            result += dx ** 3 * (d0 * self._m[k] + d1 * self._m[k + 1])
+        return result
+
+    @staticmethod
+    def _integral_none(u):
+        return 0., 0., u, 0.
+
+    @staticmethod
+    def _integral_point(u):
+        return 0., min(u, 0.5), max(u - 0.5, 0.), 0.
+
+    @staticmethod
+    def _integral_line(u):
+        u2 = 0.5 * u * u
+        return 0., u - u2, u2, 0.
+
+    @staticmethod
+    def _integral_cos(u):
+        g = 0.5 * u - math.sin(math.pi * u) / (2. * math.pi)
+        return 0., u - g, g, 0.
+
+    def _prepare_point(self):
+        self._mid = array('d', (x0 + 0.5 * dx
+                                for x0, dx in zip(self._x, self._dx)))
+
+    def _prepare_line(self):
+        _check_increasing(self._dx)
+        self._slope = array('d', map(truediv, self._dy, self._dx))
+
+    def _prepare_cubic(self):
+        _check_increasing(self._dx)
+        dx, dy = self._dx, self._dy
+        slopes = list(map(truediv, dy, dx))
+        rhs = [0.] + [6. * (s1 - s0) for s0, s1 in zip(slopes, slopes[1:])]
+        m = self._m = _natural_spline(dx, rhs + [0.])
+        h2 = [h * h for h in dx]
+        self._a0 = array('d', (h * (b - a) / 6.
+                               for h, a, b in zip(h2, m, m[1:])))
+        self._a1 = array('d', (0.5 * h * a for h, a in zip(h2, m)))
+        self._a2 = array('d', (d - h * (2. * a + b) / 6.
+                               for d, h, a, b in zip(dy, h2, m, m[1:])))
+
+    def _evaluate_none(self, i, x):
+        return self._y[i]
+
+    def _evaluate_point(self, i, x):
+        return self._y[bisect_right(self._mid, x, i - 1, i)]
+
+    def _evaluate_line(self, i, x):
+        k = i - 1
+        return self._y[k] + self._slope[k] * (x - self._x[k])
+
+    def _evaluate_cos(self, i, x):
+        k = i - 1
+        mu = (1. - math.cos(math.pi * (x - self._x[k]) / self._dx[k])) * 0.5
+        return self._y[k] + self._dy[k] * mu
+
+    def _evaluate_cubic(self, i, x):
+        k = i - 1
+        mu = (x - self._x[k]) / self._dx[k]
+        return (((self._a0[k] * mu + self._a1[k]) * mu + self._a2[k]) * mu +
+                self._y[k])
+
+    def _evaluate_registered(self, i, x):
+        return Interpolation._methods[self.method](self._lines, i, x)
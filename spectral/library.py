@@ -0,0 +1,362 @@
+"""This module provides an on-disk store for large collections of spectra.
+
+:class:`SpectralLibrary` keeps spectra in a directory. Spectra sharing the
+same grid, type and interpolation method are stored as rows of one
+intensity matrix per grid, in a binary file memory-mapped on access. An
+append-only index maps keys (temperatures, star ids, tuples of filter
+parameters, etc.) to rows, so spectra are found in O(1) and returned as
+views of the mapped file without reading the whole library into memory.
+
+Directory layout:
+    - `grid-<n>.spec` - header (see :py:mod:`spectral.spectrum`, the number
+      of points is the grid length), grid x values and intensity rows, all
+      little-endian float64.
+    - `index.jsonl` - one `[key, grid, row]` JSON list per line.
+
+Rows are indexed after they are written. Rows of an interrupted append
+have no keys and are skipped, an incomplete last row is truncated before
+the next append and an incomplete last index line is truncated when the
+library is opened.
+
+**Example**:
+::
+
+    >>>from spectral.blackbody import BlackbodySpectrumConstructor
+    >>>from spectral.library import SpectralLibrary
+    >>>with SpectralLibrary('stars') as library:
+    ...    temperatures = range(3000, 30000, 100)
+    ...    library.append_batch(
+    ...        temperatures, BlackbodySpectrumConstructor.batch(temperatures))
+    ...    library[5800].integrate()
+    ...    for keys, batch in library.batches(chunk_size=100):
+    ...        luminosity = batch.integrate()
+
+"""
+
+import json
+import mmap
+import os
+from array import array
+
+from .batch import SpectrumBatch
+from .spectrum import (Spectrum, _find_type, _from_little_endian,
+                       _pack_header, _to_little_endian, _type_name,
+                       _unpack_header)
+
+_INDEX_FILE = 'index.jsonl'
+_GRID_FILE = 'grid-%d.spec'
+_NO_KEY = object()
+
+
+def _key_from_json(value):
+    """Private function converting lists in decoded keys back to tuples."""
+    if isinstance(value, list):
+        return tuple(map(_key_from_json, value))
+    return value
+
+
+class _Grid:
+    """Private storage of spectra sharing one grid.
+
+    Rows are appended to the end of the file, the file is mapped again when
+    a row beyond the current mapping is requested.
+    """
+
+    def __init__(self, path, spectrum_type, interpolation, x):
+        self.path = path
+        self.spectrum_type = spectrum_type
+        self.interpolation = interpolation
+        self.x = x
+        self.keys = []
+        self._offset = len(_pack_header(spectrum_type, interpolation,
+                                        len(x))) + 8 * len(x)
+        self._rows = 0
+        self._data = None
+        self._file = None
+
+    @classmethod
+    def create(cls, path, spectrum_type, interpolation, x):
+        with open(path, 'xb') as f:
+            f.write(_pack_header(spectrum_type, interpolation, len(x)))
+            f.write(_to_little_endian(x))
+        return cls(path, spectrum_type, interpolation, array('d', x))
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            buffer = memoryview(f.read(4096))
+            type_name, interpolation, m, offset = _unpack_header(buffer)
+            f.seek(offset)
+            x = _from_little_endian(memoryview(f.read(8 * m)), True)
+        if len(x) != m:
+            raise ValueError("Grid file is truncated: %s" % path)
+        return cls(path, _find_type(Spectrum, type_name), interpolation, x)
+
+    def size(self):
+        """Returns number of complete rows in the file. An incomplete row
+        left by an interrupted write is truncated, so the next row is
+        appended at a row boundary."""
+        self.flush()
+        m = len(self.x)
+        if not m:
+            return len(self.keys)
+        size = os.path.getsize(self.path)
+        rows = (size - self._offset) // (8 * m)
+        if size != self._offset + 8 * m * rows:
+            os.truncate(self.path, self._offset + 8 * m * rows)
+        return rows
+
+    def append(self, data):
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(_to_little_endian(data))
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._data = None
+
+    def data(self, stop):
+        """Returns a float64 view of intensities of the first `stop` rows
+        at least."""
+        if self._data is None or self._rows < stop:
+            self.flush()
+            m = len(self.x)
+            with open(self.path, 'rb') as f:
+                buffer = memoryview(mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ))
+            self._rows = (len(buffer) - self._offset) // (8 * m) if m else 0
+            self._data = _from_little_endian(
+                buffer[self._offset:self._offset + 8 * m * self._rows],
+                False)
+        return self._data
+
+
+class SpectralLibrary:
+    """Memory-mapped on-disk store of spectra with random access by key.
+
+    Keys should be hashable JSON-compatible values: numbers, strings or
+    (nested) tuples of them. Spectra with the same x values, type and
+    interpolation method share one intensity matrix. Writes are append-only:
+    a key can't be overwritten or removed.
+
+    Returned spectra and batches are read-only views of the mapped files,
+    they don't copy intensities and remain valid after the library is
+    closed.
+
+    :param path: library directory, created if it doesn't exist
+    :type path: str, os.PathLike
+
+    :raises ValueError: if library files are broken
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        os.makedirs(self.path, exist_ok=True)
+        self._grids = []
+        self._grid_ids = dict()
+        self._index = dict()
+        while os.path.exists(self._grid_path(len(self._grids))):
+            grid = _Grid.open(self._grid_path(len(self._grids)))
+            self._register(grid)
+        index_path = os.path.join(self.path, _INDEX_FILE)
+        if os.path.exists(index_path):
+            self._load_index(index_path)
+        self._index_file = None
+
+    def _load_index(self, path):
+        """Private method loading keys from the index file.
+
+        An unterminated or undecodable last line left by an interrupted write
+        is truncated, so the next key is written on its own line.
+
+        :raises ValueError: if another line is broken
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        lines = data.split(b'\n')
+        tail = lines.pop()
+        for n, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                key, grid, row = json.loads(line)
+            except ValueError:
+                if n < len(lines) - 1 or tail:
+                    raise ValueError("Broken line %d in library index: %s"
+                                     % (n + 1, path))
+                tail = line + b'\n'
+                break
+            self._add_key(_key_from_json(key), grid, row)
+        if tail:
+            os.truncate(path, len(data) - len(tail))
+
+    def _grid_path(self, grid_id):
+        return os.path.join(self.path, _GRID_FILE % grid_id)
+
+    def _register(self, grid):
+        key = (bytes(grid.x), _type_name(grid.spectrum_type),
+               grid.interpolation)
+        self._grid_ids[key] = len(self._grids)
+        self._grids.append(grid)
+
+    def _add_key(self, key, grid_id, row):
+        self._index[key] = grid_id, row
+        keys = self._grids[grid_id].keys
+        keys.extend(_NO_KEY for _ in range(row + 1 - len(keys)))
+        keys[row] = key
+
+    def _grid(self, x, spectrum_type, interpolation):
+        """Private method returning id of a grid, the grid is created if
+        needed."""
+        key = (bytes(x), _type_name(spectrum_type), interpolation)
+        if key not in self._grid_ids:
+            self._register(_Grid.create(
+                self._grid_path(len(self._grids)), spectrum_type,
+                interpolation, x))
+        return self._grid_ids[key]
+
+    def _write(self, keys, grid_id, rows):
+        """Private method appending intensity rows with given keys.
+
+        :raises KeyError: if a key is already in the library
+        """
+        keys = list(keys)
+        for key in keys:
+            if key in self._index:
+                raise KeyError("Key is already in the library: %r" % (key,))
+        if len(set(keys)) != len(keys):
+            raise KeyError("Keys are not unique.")
+        lines = [json.dumps(key) for key in keys]
+        grid = self._grids[grid_id]
+        start = grid.size()
+        for row in rows:
+            grid.append(row)
+        grid.flush()
+        if self._index_file is None:
+            self._index_file = open(
+                os.path.join(self.path, _INDEX_FILE), 'a')
+        for i, (key, line) in enumerate(zip(keys, lines)):
+            self._index_file.write('[%s, %d, %d]\n' % (line, grid_id,
+                                                       start + i))
+            self._add_key(key, grid_id, start + i)
+        self._index_file.flush()
+
+    def append(self, key, spectrum):
+        """Appends a spectrum to the library.
+
+        :param key: spectrum key
+        :type key: int, float, str, tuple
+        :param spectrum: spectrum to store
+        :type spectrum: Spectrum
+
+        :raises KeyError: if the key is already in the library
+        :raises TypeError: if the key is not JSON-compatible
+        """
+        grid_id = self._grid(spectrum._x, type(spectrum),
+                             spectrum.interpolation)
+        self._write((key,), grid_id, (spectrum._y,))
+
+    def append_batch(self, keys, batch):
+        """Appends all spectra of a batch to the library at once.
+
+        :param keys: keys of spectra, one for each row of the batch
+        :type keys: iterable
+        :param batch: spectra to store
+        :type batch: spectral.batch.SpectrumBatch
+
+        :raises KeyError: if a key is already in the library or keys are not
+            unique
+        :raises TypeError: if a key is not JSON-compatible
+        :raises ValueError: if number of keys doesn't match the batch
+        """
+        keys = list(keys)
+        if len(keys) != len(batch):
+            raise ValueError("Number of keys doesn't match the batch: "
+                             "%d != %d" % (len(keys), len(batch)))
+        grid_id = self._grid(batch._x, batch.spectrum_type,
+                             batch.interpolation)
+        self._write(keys, grid_id, (batch._data,))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def keys(self):
+        """Returns all keys in order of appending.
+
+        :rtype: iterable
+        """
+        return self._index.keys()
+
+    def __getitem__(self, key):
+        """Returns a spectrum view by key.
+
+        :raises KeyError: if there is no such key
+        """
+        grid_id, row = self._index[key]
+        grid = self._grids[grid_id]
+        m = len(grid.x)
+        data = grid.data(row + 1)
+        return grid.spectrum_type._wrap(
+            grid.x, data[row * m:(row + 1) * m], grid.interpolation)
+
+    def batches(self, chunk_size=4096):
+        """Iterates over the library in chunks of spectra on the same grid.
+
+        :param chunk_size: (default=4096) maximum number of spectra in
+            a chunk
+        :type chunk_size: int
+
+        :return: generator of (keys, batch) pairs, batches are views of the
+            mapped files
+        :rtype: generator of (list, spectral.batch.SpectrumBatch)
+        """
+        for grid in self._grids:
+            keys = grid.keys
+            n = len(keys)
+            m = len(grid.x)
+            data = grid.data(n)
+            i = 0
+            while i < n:
+                if keys[i] is _NO_KEY:
+                    i += 1
+                    continue
+                j = i + 1
+                while j < min(i + chunk_size, n) and keys[j] is not _NO_KEY:
+                    j += 1
+                yield keys[i:j], SpectrumBatch._wrap(
+                    grid.x, data[i * m:j * m], grid.spectrum_type,
+                    grid.interpolation)
+                i = j
+
+    def flush(self):
+        """Writes buffered data to disk."""
+        for grid in self._grids:
+            grid.flush()
+        if self._index_file is not None:
+            self._index_file.flush()
+
+    def close(self):
+        """Closes library files. Spectra returned earlier remain valid."""
+        for grid in self._grids:
+            grid.close()
+        if self._index_file is not None:
+            self._index_file.close()
+            self._index_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,82 @@
+"""This module provides tools for the material interface used by
+electromagnetic filters (see :py:mod:`spectral.mock_material` for the
+interface itself).
+
+Filters evaluate material properties for all wavelengths of a grid at once.
+Materials declaring `vectorized = True` accept a sequence of wavelengths in
+`refractive_index` and `photoeffect_cross_section` (as well as a single
+wavelength) and return a sequence of values. Other materials are treated as
+scalar-only and are wrapped with an adapter by :func:`as_vectorized`.
+"""
+
+from array import array
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+_adapters = WeakKeyDictionary()
+
+
+def as_vectorized(material):
+    """Returns a material accepting wavelength sequences.
+
+    Vectorized materials are returned as is. Scalar-only materials are
+    wrapped with an adapter, which calls them for each wavelength and caches
+    results per grid and temperature. Adapters are cached per material.
+
+    :param material: material instance or class
+    :type material: object
+
+    :return: vectorized material
+    :rtype: object
+    """
+    if getattr(material, 'vectorized', False):
+        return material
+    try:
+        adapter = _adapters.get(material)
+    except TypeError:
+        return _ScalarMaterialAdapter(material)
+    if adapter is None:
+        adapter = _ScalarMaterialAdapter(material)
+        _adapters[material] = adapter
+    return adapter
+
+
+class _ScalarMaterialAdapter:
+    """Private adapter evaluating a scalar-only material over wavelength
+    sequences.
+
+    .. warning:: Results are cached, the material must not change after it
+                 was used.
+    """
+    vectorized = True
+    max_cached_grids = 16
+
+    def __init__(self, material):
+        self.material = material
+        self._cache = OrderedDict()
+
+    def __getattr__(self, name):
+        return getattr(self.material, name)
+
+    def refractive_index(self, wavelength, temperature):
+        return self._evaluate('refractive_index', wavelength, temperature)
+
+    def photoeffect_cross_section(self, wavelength, temperature):
+        return self._evaluate(
+            'photoeffect_cross_section', wavelength, temperature)
+
+    def _evaluate(self, name, wavelength, temperature):
+        f = getattr(self.material, name)
+        if isinstance(wavelength, (int, float)):
+            return f(wavelength, temperature)
+        wavelength = array('d', wavelength)
+        key = (name, wavelength.tobytes(), temperature)
+        values = self._cache.get(key)
+        if values is None:
+            values = array('d', (f(w, temperature) for w in wavelength))
+            self._cache[key] = values
+            if len(self._cache) > self.max_cached_grids:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        return values
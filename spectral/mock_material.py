@@ -1,36 +1,58 @@
 """Mock material class to provide a general structure of material type needed
 for electromagnetic filters.
+
+Material functions accept either a single wavelength or a sequence of
+wavelengths. Materials supporting sequences should declare
+`vectorized = True`; scalar-only materials are supported too, see
+:py:mod:`spectral.material`.
 """
 
+from array import array
+from itertools import repeat
+
+
+def _broadcast(value, wavelength):
+    """Private function returning a value for a single wavelength or an
+    array of values for a sequence of wavelengths."""
+    if isinstance(wavelength, (int, float)):
+        return value
+    return array('d', repeat(value, len(wavelength)))
+
 
 class MockMaterial:
     """Mock material class provides an interface for material classes
     construction to be compatible with electromagnetic filters of the package.
 
+    It is the reference vectorized material: all functions accept a single
+    wavelength or a sequence of wavelengths.
+
     It is also used in unit tests.
     """
+    vectorized = True
 
     def refractive_index(self, wavelength, temperature):
         """Refractive index of the material.
 
         :param wavelength: light wavelength in m
+        :type wavelength: float, sequence of float
         :param temperature: medium temperature in kelvins
 
         :return: differential cross-section
-        :rtype: float
+        :rtype: float, array of float
         """
-        return 1.001
+        return _broadcast(1.001, wavelength)
 
     def photoeffect_cross_section(self, wavelength, temperature):
         """Photoelectric effect cross-section in square meters.
 
         :param wavelength: light wavelength in m
+        :type wavelength: float, sequence of float
         :param temperature: medium temperature in kelvins
 
         :return: differential cross-section
-        :rtype: float
+        :rtype: float, array of float
         """
-        return 10**-34.
+        return _broadcast(10**-34., wavelength)
 
     @property
     def v(self):
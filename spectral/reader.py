@@ -0,0 +1,214 @@
+"""This module provides readers of measured spectra stored as text tables
+(CSV, whitespace separated columns, etc.).
+
+Files are read in blocks of lines, each block is parsed column by column
+directly into float64 arrays. :func:`read_chunks` yields fixed-size chunks
+while the file is being read, so processing may start before the whole
+file is parsed and memory usage doesn't depend on the file size.
+:func:`read_spectrum` reads the whole file into a spectrum.
+
+**Example**:
+::
+
+    >>>from spectral.reader import read_chunks, read_spectrum
+    >>>from spectral.spectrum import Spectrum
+    >>>sun = read_spectrum('solar.csv', delimiter=',', skip_rows=1,
+    ...                    x_unit='nm', y_scale=10**9)
+    >>># out-of-core integral with line interpolation, the last point
+    >>># of a chunk is prepended to the next one
+    >>>total, last = 0., None
+    >>>for x, y in read_chunks('solar.csv', delimiter=',', skip_rows=1,
+    ...                        x_unit='nm', y_scale=10**9):
+    ...    if last is not None:
+    ...        x.insert(0, last[0])
+    ...        y.insert(0, last[1])
+    ...    total += Spectrum.from_arrays(x, y, 'line').integrate()
+    ...    last = x[-1], y[-1]
+
+"""
+
+from array import array
+from itertools import islice, repeat
+from operator import itemgetter, methodcaller, mul
+
+from .spectrum import Spectrum
+
+UNITS = {
+    'm': 1.,
+    'cm': 10.**-2,
+    'mm': 10.**-3,
+    'um': 10.**-6,
+    'nm': 10.**-9,
+    'A': 10.**-10,
+}
+"""Wavelength units and their values in m."""
+
+
+def _unit_scale(unit):
+    """Private function returning a scale factor for a unit name or
+    a number.
+
+    :raises ValueError: if the unit name is not known
+    """
+    if isinstance(unit, str):
+        try:
+            return UNITS[unit]
+        except KeyError:
+            raise ValueError("Unknown unit: %s, available units: %s"
+                             % (unit, ', '.join(UNITS)))
+    return float(unit)
+
+
+def _open(file):
+    """Private function returning a text file and whether it should be
+    closed by the reader."""
+    if hasattr(file, 'read'):
+        return file, False
+    return open(file), True
+
+
+def _split(lines, delimiter):
+    """Private function returning fields of lines as a flat list and the
+    number of fields in each line, or (None, None) if lines have different
+    numbers of fields or are separated by whitespace.
+
+    Delimiters of each line are counted first, then all lines are joined
+    and split at once. Runs of whitespace can't be counted this way, so
+    such lines are split one by one.
+    """
+    if delimiter is None:
+        return None, None
+    n = lines[0].count(delimiter)
+    if any(map(n.__ne__, map(methodcaller('count', delimiter), lines))):
+        return None, None
+    n += 1
+    text = ''.join(lines)
+    if not text.endswith('\n'):
+        text += '\n'
+    fields = text.replace('\r\n', '\n').replace(
+        '\n', delimiter).split(delimiter)
+    fields.pop()
+    if len(fields) != n * len(lines):
+        return None, None
+    return fields, n
+
+
+def _parse(lines, delimiter, columns, scales):
+    """Private function parsing columns of data lines into float64 arrays.
+
+    Lines are split at once if possible, otherwise one by one, see
+    :func:`_split`.
+
+    :raises ValueError: if a line has not enough columns or a value is not
+        a number
+    """
+    fields, n = _split(lines, delimiter)
+    if fields is None:
+        rows = [line.split(delimiter) for line in lines]
+    result = []
+    for column, scale in zip(columns, scales):
+        try:
+            if fields is not None and column < n:
+                values = array('d', map(float, fields[column::n]))
+            else:
+                values = array('d', map(float, map(itemgetter(column),
+                                                   rows)))
+        except (IndexError, ValueError):
+            for line in lines:
+                try:
+                    float(line.split(delimiter)[column])
+                except (IndexError, ValueError):
+                    raise ValueError("Can't read column %d in line: %r"
+                                     % (column, line))
+            raise
+        if scale != 1.:
+            values = array('d', map(mul, values, repeat(scale)))
+        result.append(values)
+    return result
+
+
+def read_chunks(file, chunk_size=65536, delimiter=None, columns=(0, 1),
+                x_unit='m', y_scale=1., comments='#', skip_rows=0):
+    """Reads (wavelength, intensity) columns of a text table in chunks.
+
+    Empty lines and lines starting with a comment prefix are skipped. Each
+    chunk contains `chunk_size` data rows (except the last one) in the file
+    order.
+
+    :param file: path or a text file opened for reading
+    :type file: str, os.PathLike, file object
+    :param chunk_size: (default=65536) number of rows in a chunk
+    :type chunk_size: int
+    :param delimiter: (default is None) column delimiter, any whitespace if
+        None
+    :type delimiter: str, None
+    :param columns: (default=(0, 1)) indexes of wavelength and intensity
+        columns
+    :type columns: (int, int)
+    :param x_unit: (default='m') wavelength unit name from :data:`UNITS` or
+        its value in m
+    :type x_unit: str, float
+    :param y_scale: (default=1.) factor applied to intensities
+    :type y_scale: float
+    :param comments: (default='#') comment line prefix, None to disable
+    :type comments: str, None
+    :param skip_rows: (default=0) number of lines skipped at the beginning
+        of the file (e.g. a header)
+    :type skip_rows: int
+
+    :return: generator of (wavelengths in m, intensities) pairs
+    :rtype: generator of (array of float, array of float)
+
+    :raises ValueError: if chunk size < 1, the unit is not known or a line
+        can't be parsed
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be >= 1, but got %d" % chunk_size)
+    scales = (_unit_scale(x_unit), float(y_scale))
+    f, owned = _open(file)
+    try:
+        lines = islice(f, skip_rows, None)
+        data = []
+        while True:
+            block = list(islice(lines, chunk_size))
+            if comments:
+                data.extend([line for line in block if not line.isspace()
+                             and not line.lstrip().startswith(comments)])
+            else:
+                data.extend([line for line in block if not line.isspace()])
+            while len(data) >= chunk_size or data and not block:
+                yield tuple(_parse(data[:chunk_size], delimiter, columns,
+                                   scales))
+                del data[:chunk_size]
+            if not block:
+                break
+    finally:
+        if owned:
+            f.close()
+
+
+def read_spectrum(file, delimiter=None, columns=(0, 1), x_unit='m',
+                  y_scale=1., comments='#', skip_rows=0,
+                  spectrum_type=Spectrum, interpolation='point'):
+    """Reads a spectrum from a text table.
+
+    See :func:`read_chunks` for the description of the table parameters.
+    Rows are sorted by wavelength if they are not sorted in the file.
+
+    :param spectrum_type: default is Spectrum, type of the spectrum
+    :type spectrum_type: type
+    :param interpolation: default is 'point', interpolation method name
+    :type interpolation: str
+
+    :return: new spectrum
+    :rtype: Spectrum
+
+    :raises ValueError: if the unit is not known or a line can't be parsed
+    """
+    x, y = array('d'), array('d')
+    for x_chunk, y_chunk in read_chunks(
+            file, delimiter=delimiter, columns=columns, x_unit=x_unit,
+            y_scale=y_scale, comments=comments, skip_rows=skip_rows):
+        x.extend(x_chunk)
+        y.extend(y_chunk)
+    return spectrum_type.from_arrays(x, y, interpolation)
@@ -0,0 +1,374 @@
+"""This module provides shared memory transport of spectra and batches for
+process executors (see :py:mod:`spectral.executor`).
+
+:func:`share` places data of a spectrum or a batch into a
+:class:`multiprocessing.shared_memory.SharedMemory` block.
+:func:`spectral.executor.map_chunks` sends arrays of such spectra and
+batches to worker processes as small handles (block name, offset, shape and
+dtype), so intensities are not copied: workers map the same block and wrap
+it without copying, the block is closed in the worker when the chunk is
+processed. Resampling and filtering of shared spectra with a process
+executor also write results into a shared block instead of sending them
+back through a pipe.
+
+Regular pickling of shared spectra and batches copies their data, so pickles
+don't depend on the lifetime of blocks.
+
+Blocks are owned by the process which created them and unlinked with
+:func:`release` (or at exit).
+
+**Example**:
+::
+
+    >>>from spectral import shared
+    >>>with shared.sharing(BlackbodySpectrumConstructor(5800)) as s:
+    ...    filtered = RayleighFilter(s, mat_abundances, molecules, 290.)
+
+"""
+
+import atexit
+import ctypes
+import os
+import sys
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+
+SharedHandle = namedtuple('SharedHandle', ('name', 'offset', 'shape',
+                                           'dtype'))
+"""Location of an array in a shared memory block: block name, offset in
+bytes, shape and dtype (struct format character)."""
+
+_blocks = dict()
+_names = dict()
+_owned = set()
+_released = []
+_inherited = []
+
+
+def _forget():
+    """Private function clearing the registry in a forked child process.
+    Blocks of the parent are kept referenced, so they are never closed or
+    unlinked by the child."""
+    _inherited.extend(_blocks.values())
+    _inherited.extend(_released)
+    _blocks.clear()
+    _names.clear()
+    _owned.clear()
+    _released.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget)
+
+
+def _register(block):
+    """Private function registering a block created or mapped by the
+    process."""
+    _blocks[block.name] = block
+    _names[id(block.buf.obj)] = block.name
+
+
+def _close(block):
+    """Private function closing a block if its memory isn't used anymore.
+
+    :return: True if the block is closed
+    :rtype: bool
+    """
+    try:
+        block.close()
+    except BufferError:
+        return False
+    for key in [k for k, name in _names.items() if name == block.name]:
+        del _names[key]
+    return True
+
+
+def _retire(names):
+    """Private function removing blocks from the registry and closing them.
+    Blocks which are still in use are closed later."""
+    _released.extend(_blocks.pop(name) for name in names)
+    _released[:] = [b for b in _released if not _close(b)]
+
+
+def _address(buffer):
+    """Private function returning memory address of a writable buffer."""
+    return ctypes.addressof(ctypes.c_char.from_buffer(buffer))
+
+
+def _allocate(size):
+    """Private function returning a new block and its float64 view."""
+    block = SharedMemory(create=True, size=max(8 * size, 1))
+    _register(block)
+    _owned.add(block.name)
+    return block, block.buf[:8 * size].cast('d')
+
+
+def handle(buffer):
+    """Returns a handle of a buffer placed in a shared memory block.
+
+    Only writable contiguous float64 memoryviews of blocks created with this
+    module (or attached by handles) have handles.
+
+    :param buffer: buffer
+    :type buffer: memoryview, array, any
+
+    :return: buffer handle or None if the buffer isn't shared
+    :rtype: SharedHandle, None
+    """
+    if not isinstance(buffer, memoryview) or buffer.readonly or \
+            buffer.format != 'd' or not buffer.c_contiguous or \
+            not buffer.nbytes:
+        return None
+    name = _names.get(id(buffer.obj))
+    if name not in _blocks:
+        return None
+    offset = _address(buffer) - _address(_blocks[name].buf)
+    return SharedHandle(name, offset, buffer.shape, buffer.format)
+
+
+def _open(name):
+    """Private function mapping an existing block. Only the owner process
+    tracks and unlinks blocks."""
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    # the block is registered in the resource tracker shared with the owner
+    # (see spectral.executor), where it is already registered
+    return SharedMemory(name=name)
+
+
+def attach(handle):
+    """Returns a memoryview of a shared array by its handle. The block is
+    mapped if it isn't mapped in the process yet and stays mapped, use
+    :func:`resolving` to close it when the array is not needed anymore.
+
+    :param handle: array handle
+    :type handle: SharedHandle
+
+    :return: writable view of the array
+    :rtype: memoryview
+
+    :raises FileNotFoundError: if the block doesn't exist
+    """
+    name, offset, shape, dtype = handle
+    block = _blocks.get(name)
+    if block is None:
+        block = _open(name)
+        _register(block)
+    size = 8
+    for n in shape:
+        size *= n
+    view = block.buf[offset:offset + size]
+    if len(shape) > 1:
+        return view.cast(dtype, shape)
+    return view.cast(dtype)
+
+
+class SharedView:
+    """Picklable reference to an array in shared memory.
+
+    It is pickled as its handle, use :func:`SharedView.resolve` or
+    :func:`resolving` to get a memoryview of the array.
+
+    :param handle: array handle
+    :type handle: SharedHandle
+    """
+    __slots__ = ('handle',)
+
+    def __init__(self, handle):
+        self.handle = handle
+
+    def __reduce__(self):
+        return SharedView, (self.handle,)
+
+    def resolve(self):
+        """Returns a memoryview of the array, see :func:`attach`.
+
+        :rtype: memoryview
+        """
+        return attach(self.handle)
+
+
+@contextmanager
+def resolving(values):
+    """Context manager replacing :class:`SharedView` values with memoryviews
+    of their arrays.
+
+    On exit the memoryviews are released and blocks mapped for them are
+    closed, so worker processes don't keep mappings of temporary blocks
+    between tasks. The memoryviews must not be used after exit.
+
+    :param values: any values
+    :type values: iterable
+
+    :return: values, shared views are resolved
+    :rtype: list
+    """
+    mapped = set(_blocks)
+    resolved, views = [], []
+    for value in values:
+        if isinstance(value, SharedView):
+            value = value.resolve()
+            views.append(value)
+        resolved.append(value)
+    try:
+        yield resolved
+    finally:
+        resolved.clear()
+        _release_views(views)
+        _retire([name for name in _blocks if name not in mapped])
+
+
+def _release_views(views):
+    """Private function releasing memoryviews which aren't exported."""
+    for view in views:
+        try:
+            view.release()
+        except BufferError:
+            pass
+    views.clear()
+
+
+def transportable(value):
+    """Returns a value which can be sent to another process without copying
+    shared arrays.
+
+    Shared memoryviews are replaced with :class:`SharedView`, other
+    memoryviews are copied into arrays (memoryviews can't be pickled).
+
+    :param value: any value
+    :return: value for sending
+    """
+    if isinstance(value, memoryview):
+        h = handle(value)
+        if h is not None:
+            return SharedView(h)
+        return array(value.format, value)
+    return value
+
+
+def _buffer_names(obj):
+    """Private function returning names of data attributes of a spectrum or
+    a batch."""
+    return ('_x', '_data') if hasattr(obj, '_data') else ('_x', '_y')
+
+
+def is_shared(obj):
+    """Checks whether all data of a spectrum or a batch is in shared
+    memory.
+
+    :param obj: spectrum or batch
+    :type obj: spectral.spectrum.Spectrum, spectral.batch.SpectrumBatch
+    :rtype: bool
+    """
+    return all(handle(getattr(obj, name)) is not None
+               for name in _buffer_names(obj))
+
+
+def share(obj):
+    """Returns a copy of a spectrum or a batch placed in a new shared memory
+    block.
+
+    :param obj: spectrum or batch
+    :type obj: spectral.spectrum.Spectrum, spectral.batch.SpectrumBatch
+
+    :return: spectrum or batch of the same type
+    :rtype: spectral.spectrum.Spectrum, spectral.batch.SpectrumBatch
+    """
+    buffers = [getattr(obj, name) for name in _buffer_names(obj)]
+    block, data = _allocate(sum(map(len, buffers)))
+    views, offset = [], 0
+    for b in buffers:
+        view = data[offset:offset + len(b)]
+        view[:] = memoryview(b).cast('B').cast('d')
+        views.append(view)
+        offset += len(b)
+    if hasattr(obj, '_data'):
+        return obj._wrap(views[0], views[1], obj.spectrum_type,
+                         obj.interpolation)
+    return obj._wrap(views[0], views[1], obj.interpolation)
+
+
+def release(obj):
+    """Unlinks shared memory blocks of a spectrum or a batch created with
+    :func:`share`.
+
+    Spectra using the blocks remain valid in the current process, the memory
+    is freed after all of them are deleted.
+
+    :param obj: spectrum or batch
+    :type obj: spectral.spectrum.Spectrum, spectral.batch.SpectrumBatch
+    """
+    for name in _buffer_names(obj):
+        buffer = getattr(obj, name)
+        if isinstance(buffer, memoryview):
+            _unlink(_names.get(id(buffer.obj)))
+
+
+def _unlink(name):
+    """Private function unlinking an owned block."""
+    if name not in _owned:
+        return
+    _owned.discard(name)
+    _blocks[name].unlink()
+    _retire((name,))
+
+
+@contextmanager
+def sharing(obj):
+    """Context manager sharing a spectrum or a batch, see :func:`share`.
+    Blocks are released on exit.
+
+    :param obj: spectrum or batch
+    :type obj: spectral.spectrum.Spectrum, spectral.batch.SpectrumBatch
+    """
+    shared = share(obj)
+    try:
+        yield shared
+    finally:
+        release(shared)
+
+
+@contextmanager
+def temporary(*buffers):
+    """Context manager providing shared float64 arrays.
+
+    Each argument is either a size of a new zero-filled array or a buffer.
+    Shared buffers are used as is, others are copied into shared memory.
+    On exit new arrays are released and the temporary block is unlinked,
+    so they must not be used after exit.
+
+    :param buffers: sizes or float64 buffers
+    :type buffers: int, array, memoryview
+
+    :return: shared arrays, one for each argument
+    :rtype: list of memoryview
+    """
+    sizes = [0 if handle(b) is not None else b if isinstance(b, int)
+             else len(b) for b in buffers]
+    block, data = _allocate(sum(sizes))
+    views, created, offset = [], [data], 0
+    try:
+        for b, size in zip(buffers, sizes):
+            if handle(b) is not None:
+                views.append(b)
+                continue
+            view = data[offset:offset + size]
+            if not isinstance(b, int):
+                view[:] = memoryview(b).cast('B').cast('d')
+            views.append(view)
+            created.append(view)
+            offset += size
+        yield views
+    finally:
+        views.clear()
+        _release_views(created)
+        _unlink(block.name)
+
+
+@atexit.register
+def _unlink_all():
+    """Private function unlinking owned blocks at exit."""
+    for name in list(_owned):
+        _unlink(name)
@@ -1,12 +1,185 @@
 """This module provides a base Spectrum class which could be used to store
 and process different types of spectral band data.
-"""
 
-from multiprocessing.pool import Pool
+Spectra can be saved to a compact binary file with :meth:`Spectrum.save`
+and loaded back with :meth:`Spectrum.load`. A file consists of a header
+and two raw little-endian float64 arrays (x values and intensities):
+
+    ======  ====  ==========================================
+    offset  size  content
+    ======  ====  ==========================================
+    0       4     magic bytes `SPEC`
+    4       2     format version
+    6       2     dtype, `<d` (little-endian float64)
+    8       2     interpolation method name size in bytes
+    10      2     spectrum type name size in bytes
+    12      8     number of points
+    20            interpolation method name, spectrum type name
+                  (utf-8, 'module.QualName'), zero padding to a
+                  multiple of 8 bytes
+    ======  ====  ==========================================
+
+"""
 
-from .interpolation import Interpolation
+import mmap
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from itertools import islice, repeat
+from operator import add, itemgetter, le, mul, sub
+
+from . import shared
+from .executor import is_parallel, map_chunks
+from .interpolation import Interpolator
 from tools.typechecker import check_types
 
+_MAGIC = b'SPEC'
+_FORMAT_VERSION = 1
+_DTYPE = b'<d'
+_HEADER = struct.Struct('<4sH2sHHQ')
+
+
+def _as_float_array(values):
+    """Private function returning values as a contiguous float64 buffer.
+
+    `array('d')` instances and float64 memoryviews are returned as is, other
+    iterables are copied into a new `array('d')`.
+    """
+    if isinstance(values, array) and values.typecode == 'd':
+        return values
+    if isinstance(values, memoryview) and values.format == 'd':
+        return values
+    return array('d', values)
+
+
+def _resample_shared_chunk(indexes, x_values, x, y, interpolation, out):
+    """Private function writing values of a spectrum given by its arrays for
+    a range of x values into a shared array."""
+    i, j = indexes.start, indexes.stop
+    out[i:j] = array('d', Interpolator(x, y, interpolation).many(
+        x_values[i:j]))
+    return ()
+
+
+def _type_name(cls):
+    """Private function returning a qualified name of a class."""
+    return '%s.%s' % (cls.__module__, cls.__qualname__)
+
+
+def _find_type(base, name):
+    """Private function searching for a subclass of base (or base itself) by
+    its qualified name.
+
+    :raises ValueError: if there is no such class
+    """
+    types = [base]
+    while types:
+        cls = types.pop()
+        if _type_name(cls) == name:
+            return cls
+        types.extend(cls.__subclasses__())
+    raise ValueError("Unknown spectrum type: %s" % name)
+
+
+def _pack_header(spectrum_type, interpolation, length):
+    """Private function returning a binary file header padded to a multiple
+    of 8 bytes."""
+    method = interpolation.encode()
+    type_name = _type_name(spectrum_type).encode()
+    header = _HEADER.pack(_MAGIC, _FORMAT_VERSION, _DTYPE, len(method),
+                          len(type_name), length) + method + type_name
+    return header + bytes(-len(header) % 8)
+
+
+def _unpack_header(buffer):
+    """Private function parsing a binary file header.
+
+    :return: spectrum type name, interpolation method, number of points and
+        header size in bytes
+    :rtype: (str, str, int, int)
+
+    :raises ValueError: if the header is invalid or not supported
+    """
+    if len(buffer) < _HEADER.size:
+        raise ValueError("Not a spectrum file: header is too short.")
+    magic, version, dtype, method_size, type_size, length = \
+        _HEADER.unpack_from(buffer)
+    if magic != _MAGIC:
+        raise ValueError("Not a spectrum file: wrong magic bytes.")
+    if version != _FORMAT_VERSION:
+        raise ValueError("Unsupported spectrum file version: %d" % version)
+    if dtype != _DTYPE:
+        raise ValueError("Unsupported spectrum file dtype: %r" % dtype)
+    offset = _HEADER.size
+    names = bytes(buffer[offset:offset + method_size + type_size]).decode()
+    size = offset + method_size + type_size
+    return (names[method_size:], names[:method_size], length,
+            size + -size % 8)
+
+
+def _to_little_endian(values):
+    """Private function returning float64 values as little-endian bytes."""
+    if sys.byteorder == 'little':
+        return memoryview(values).cast('B')
+    values = array('d', values)
+    values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(buffer, copy):
+    """Private function returning a float64 buffer from little-endian bytes.
+    The buffer is wrapped without copying if possible."""
+    if sys.byteorder == 'little' and not copy:
+        return buffer.cast('d')
+    values = array('d')
+    values.frombytes(buffer)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _resample_chunk(x_values, spectrum):
+    """Private function returning spectrum values for a chunk of x values.
+    """
+    return spectrum.get_values(x_values)
+
+
+class _Lines(Sequence):
+    """Private read-only view of spectrum data as a sequence of
+    (value, intensity) pairs.
+
+    It is used for compatibility with the code written for the older
+    tuple-of-tuples storage. Pairs are created on access, so prefer
+    :attr:`Spectrum.x_values` and :attr:`Spectrum.intensities` in
+    performance-critical code.
+    """
+
+    __slots__ = ('_x', '_y')
+
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+
+    def __len__(self):
+        return len(self._x)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return tuple(zip(self._x[item], self._y[item]))
+        return self._x[item], self._y[item]
+
+    def __iter__(self):
+        return zip(self._x, self._y)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return tuple(self) == tuple(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, tuple(self))
+
 
 class Spectrum:
     """This is a class-container for common spectral date.
@@ -21,6 +194,12 @@ class Spectrum:
     such as: sum, multiplication and subtraction, but these operations only
     provided for spectra with matching x values.
 
+    Internally the data is stored as two contiguous float64 arrays
+    (wavelengths and intensities). :attr:`Spectrum.lines`,
+    :attr:`Spectrum.x_values` and :attr:`Spectrum.intensities` are read-only
+    views of these arrays. Use :meth:`Spectrum.from_arrays` to construct
+    a spectrum from already separated values without creating pairs.
+
     .. :note:: Spectra can be summed, subtracted one from another or multiplied
 
     :param lines: list of (value, intensity) pairs. Actual spectral data is
@@ -34,14 +213,169 @@ class Spectrum:
     """
 
     def __init__(self, lines, interpolation='point'):
-        self.lines = list(lines)
-        self.lines.sort(key=lambda x: x[0])
-        self.lines = tuple(self.lines)
+        self.lines = lines
         self.interpolation = interpolation
 
+    @classmethod
+    def from_arrays(cls, x_values, y_values, interpolation='point'):
+        """Constructs a spectrum from separate x values and intensities.
+
+        `array('d')` instances and float64 memoryviews are used without
+        copying, so they should not be modified afterwards.
+        Data is sorted by x values only if it isn't sorted already.
+
+        :param x_values: x values (wavelengths)
+        :type x_values: array, memoryview, iterable of float
+        :param y_values: intensities
+        :type y_values: array, memoryview, iterable of float
+        :param interpolation: default is 'point', interpolation method name
+        :type interpolation: str
+
+        :return: new spectrum
+        :rtype: Spectrum
+
+        :raises ValueError: if lengths of x and y values do not match
+        """
+        x, y = _as_float_array(x_values), _as_float_array(y_values)
+        if len(x) != len(y):
+            raise ValueError(
+                "Lengths of x values and intensities do not match: %d != %d"
+                % (len(x), len(y)))
+        if not all(map(le, x, islice(x, 1, None))):
+            order = sorted(range(len(x)), key=x.__getitem__)
+            x = array('d', map(x.__getitem__, order))
+            y = array('d', map(y.__getitem__, order))
+        return cls._wrap(x, y, interpolation)
+
+    @classmethod
+    def _wrap(cls, x, y, interpolation):
+        """Private constructor wrapping already validated float64 buffers.
+        """
+        spectrum = cls.__new__(cls)
+        spectrum._x, spectrum._y = x, y
+        spectrum.interpolation = interpolation
+        return spectrum
+
+    @property
+    def interpolation(self):
+        """Interpolation method name, see
+        :class:`spectral.interpolation.Interpolation`.
+
+        :rtype: str
+        """
+        return self._interpolation
+
+    @interpolation.setter
+    def interpolation(self, method):
+        self._interpolation = method
+        self._interpolator = None
+
+    @property
+    def interpolator(self):
+        """Interpolator for the spectrum data. It is built on first access and
+        cached on the instance.
+
+        :rtype: spectral.interpolation.Interpolator
+
+        :raises ValueError: if the interpolation method is not available
+        """
+        if self._interpolator is None:
+            self._interpolator = Interpolator(
+                self._x, self._y, self._interpolation)
+        return self._interpolator
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_interpolator'] = None
+        for name in ('_x', '_y'):
+            if isinstance(state[name], memoryview):
+                state[name] = array('d', state[name])
+        return state
+
+    def save(self, file):
+        """Saves the spectrum to a binary file, see :py:mod:`spectral.spectrum`
+        for the format description.
+
+        :param file: path or a binary file opened for writing
+        :type file: str, os.PathLike, file object
+        """
+        if not hasattr(file, 'write'):
+            with open(file, 'wb') as f:
+                return self.save(f)
+        file.write(_pack_header(type(self), self.interpolation,
+                                len(self._x)))
+        file.write(_to_little_endian(self._x))
+        file.write(_to_little_endian(self._y))
+
+    @classmethod
+    def load(cls, file, copy=False):
+        """Loads a spectrum from a binary file saved with
+        :meth:`Spectrum.save`.
+
+        The file is memory-mapped and the spectrum wraps read-only views of
+        its arrays without copying (on little-endian machines), so loading
+        costs the same for any spectrum size and pages are read on access.
+        The type of the spectrum is the saved one, so it should be imported
+        before loading.
+
+        File objects are read from their current position, which is moved
+        to the end of the spectrum, so several spectra saved one after
+        another to the same file are loaded with consecutive calls.
+
+        :param file: path or a binary file opened for reading
+        :type file: str, os.PathLike, file object
+        :param copy: (default=False) if True, data is read into memory
+        :type copy: bool
+
+        :return: loaded spectrum
+        :rtype: Spectrum
+
+        :raises ValueError: if the file is not a valid spectrum file or
+            the spectrum type is unknown
+        :raises TypeError: if the saved spectrum type is not cls or its
+            subclass
+        """
+        if not hasattr(file, 'read'):
+            with open(file, 'rb') as f:
+                return cls.load(f, copy)
+        start = file.tell() if file.seekable() else 0
+        try:
+            buffer = memoryview(mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ))[start:]
+        except (AttributeError, OSError, ValueError):
+            buffer = memoryview(file.read())
+        type_name, interpolation, n, offset = _unpack_header(buffer)
+        if len(buffer) < offset + 16 * n:
+            raise ValueError("Spectrum file is truncated.")
+        if file.seekable():
+            file.seek(start + offset + 16 * n)
+        spectrum_type = _find_type(Spectrum, type_name)
+        if not issubclass(spectrum_type, cls):
+            raise TypeError("Type mismatch error: %s and %s"
+                            % (cls, spectrum_type))
+        x = _from_little_endian(buffer[offset:offset + 8 * n], copy)
+        y = _from_little_endian(buffer[offset + 8 * n:offset + 16 * n], copy)
+        return spectrum_type._wrap(x, y, interpolation)
+
+    @property
+    def lines(self):
+        """Read-only sequence of (value, intensity) pairs.
+
+        :return: spectral lines view
+        :rtype: sequence of (float, float)
+        """
+        return _Lines(self._x, self._y)
+
+    @lines.setter
+    def lines(self, lines):
+        lines = sorted(lines, key=itemgetter(0))
+        self._x = array('d', map(itemgetter(0), lines))
+        self._y = array('d', map(itemgetter(1), lines))
+        self._interpolator = None
+
     def get_value(self, x):
         """Returns value for a given x coordinate. It uses interpolation
-        algorithm. Uses :class:`interpolation.Interpolation`.
+        algorithm. Uses :attr:`Spectrum.interpolator`.
 
         :param x: coordinate
         :type x: int, float
@@ -49,11 +383,29 @@ class Spectrum:
         :return: point with
         :rtype: float
         """
-        return Interpolation.interpolate(self.lines, x, self.interpolation)
+        return self.interpolator(x)
+
+    def get_values(self, xs):
+        """Returns values for a sequence of x coordinates. Uses
+        :attr:`Spectrum.interpolator`.
+
+        :param xs: coordinates
+        :type xs: iterable of float
+
+        :return: values in given points
+        :rtype: list of float
+        """
+        return self.interpolator.many(xs)
 
     def integrate(self, x0=None, x1=None):
         """Integrates a spectrum in a specified range.
 
+        The integral is computed in closed form for the spectrum
+        interpolation method, partial bins at the borders included.
+        A cumulative integral is built once and cached, so each call is two
+        binary searches and a subtraction.
+        See :func:`spectral.interpolation.Interpolator.integrate`.
+
         :param x0: bottom border
         :type x0: float, None
         :param x1: top border
@@ -61,15 +413,14 @@ class Spectrum:
 
         .. note:: if x0 or/and x1 not specified or None, then minimum value of
                   the spectrum will be taken for x0 and/or maximum value will
-                  taken for x1.
+                  taken for x1. Borders outside the spectrum are clamped to it.
 
         :return: sum inside given range
         :rtype: float, int
 
         :raises ValueError: if x0 > x1
         """
-        # 1.01 to compensate gate effect
-        return sum((i for w, i in self._yield_integrated_bins(x0, x1)))
+        return self.interpolator.integrate(x0, x1)
 
     @property
     def maximum(self):
@@ -81,27 +432,26 @@ class Spectrum:
         :return: band, containing max value
         :rtype: (float, float)
         """
-        return max(self.lines, key=lambda x: x[1])
+        n = max(range(len(self._y)), key=self._y.__getitem__)
+        return self._x[n], self._y[n]
 
     @property
     def x_values(self):
-        """Returns a generator containing all x values of spectrum lines.
+        """Returns a read-only view of all x values of spectrum lines.
 
         :return: x values
-        :rtype: generator of float
+        :rtype: memoryview of float
         """
-        for (x, y) in self.lines:
-            yield x
+        return memoryview(self._x).toreadonly()
 
     @property
     def intensities(self):
-        """Returns a generator containing all intensities presented in lines.
+        """Returns a read-only view of all intensities presented in lines.
 
         :return: y values
-        :rtype: generator of float
+        :rtype: memoryview of float
         """
-        for (x, y) in self.lines:
-            yield y
+        return memoryview(self._y).toreadonly()
 
     @check_types
     def resample(self, other):
@@ -111,7 +461,10 @@ class Spectrum:
         executed before arithmetic operations with two spectra. Use it manually
         by yourself when needed.
 
-        This function uses multiprocessing.
+        Large spectra are resampled in chunks with the current executor,
+        see :py:mod:`spectral.executor`. If the spectrum is in shared memory
+        (see :py:mod:`spectral.shared`), workers receive handles of its arrays
+        and write results into a shared array.
 
         .. note:: This procedure preserves interpolation algorithm from the
                   parent spectrum.
@@ -122,38 +475,28 @@ class Spectrum:
         :return: new spectrum compatible with other
         :rtype: Spectrum
         """
-        p = Pool()
-        y_values = p.map(self.get_value, other.x_values)
-        p.close()
-        p.join()
-        lines = zip(other.x_values, y_values)
-        return type(self)(lines, interpolation=self.interpolation)
-
-    def _yield_integrated_bins(self, x0, x1):
-        """This private method is used to provide integrated columns of
-        the spectrum as a generator.
-
-        This is a private function for different type of spectral summs.
-        It provides validation check and summs data. You should not use this
-        function directly. Use :func:`Spectrum.integrate` instead.
-        """
-        if not x0:
-            x0 = self.lines[0][0]
-        if not x1:
-            x1 = self.lines[-1][0]
-        if x0 > x1:
-            raise ValueError(
-                "Range must be valid, got x0 > x1, %f > %f" % (x0, x1))
-        for n, (w, i) in enumerate(self.lines[1:]):
-            if w < x0:
-                continue
-            w0, i0 = self.lines[n]
-            dw = w - w0
-            w_avg = w0 + dw * 0.5
-            i1 = self.get_value(w_avg) * dw
-            if w >= x1:
-                break
-            yield (w_avg, i1)
+        n = len(other._x)
+        if is_parallel(n) and shared.is_shared(self):
+            with shared.temporary(other._x, n) as (x_values, out):
+                map_chunks(_resample_shared_chunk, range(n), x_values,
+                           self._x, self._y, self.interpolation, out)
+                y_values = array('d', out)
+        else:
+            y_values = array('d', map_chunks(_resample_chunk, other._x,
+                                             self))
+        return self._wrap(other._x, y_values, self.interpolation)
+
+    def _combine(self, other, op):
+        """Private method applying a binary operation to intensities of two
+        spectra with matching x values.
+
+        :raises ValueError: if x values of the spectra do not match
+        """
+        if self._x is not other._x and self._x != other._x:
+            raise ValueError("Spectral lines of given spectra do not "
+                             "match each other.")
+        return self._wrap(self._x, array('d', op(self._y, other._y)),
+                          self.interpolation)
 
     @check_types
     def __add__(self, other):
@@ -171,13 +514,7 @@ class Spectrum:
         :return: new spectrum
         :rtype: Spectrum
         """
-        new_lines = []
-        for (s1_x, s1_y), (s2_x, s2_y) in zip(self.lines, other.lines):
-            if s1_x != s2_x:
-                raise ValueError("Spectral lines of given spectra do not"
-                                 "match each other.")
-            new_lines.append((s1_x, s1_y + s2_y))
-        return type(self)(new_lines, interpolation=self.interpolation)
+        return self._combine(other, lambda y1, y2: map(add, y1, y2))
 
     @check_types
     def __sub__(self, other):
@@ -194,13 +531,8 @@ class Spectrum:
         :return: new spectrum
         :rtype: Spectrum
         """
-        new_lines = []
-        for (s1_x, s1_y), (s2_x, s2_y) in zip(self.lines, other.lines):
-            if s1_x != s2_x:
-                raise ValueError("Spectral lines of given spectra do not"
-                                 "match each other.")
-            new_lines.append((s1_x, max(s1_y - s2_y, 0)))
-        return type(self)(new_lines, interpolation=self.interpolation)
+        return self._combine(
+            other, lambda y1, y2: map(max, map(sub, y1, y2), repeat(0.)))
 
     @check_types
     def __mul__(self, other):
@@ -216,10 +548,4 @@ class Spectrum:
         :return: new spectrum
         :rtype: Spectrum
         """
-        new_lines = []
-        for (s1_x, s1_y), (s2_x, s2_y) in zip(self.lines, other.lines):
-            if s1_x != s2_x:
-                raise ValueError("Spectral lines of given spectra do not"
-                                 "match each other.")
-            new_lines.append((s1_x, s1_y * s2_y))
-        return type(self)(new_lines, interpolation=self.interpolation)
+        return self._combine(other, lambda y1, y2: map(mul, y1, y2))
@@ -0,0 +1,60 @@
+"""This module provides tests for :py:mod:`spectral.batch` module."""
+
+import pickle
+import unittest
+
+from spectral.batch import SpectrumBatch
+from spectral.blackbody import (BlackbodySpectrumConstructor,
+                                ElectromagneticSpectrum)
+from spectral.spectrum import Spectrum
+
+
+class TestSpectrumBatch(unittest.TestCase):
+
+    def setUp(self):
+        self._x = (150, 200.1, 320.3, 420.)
+        self._rows = ((4200, 943.99, 536, 656), (1, 2, 3, 4))
+        self.batch = SpectrumBatch(self._x, self._rows, interpolation='line')
+
+    def test_batch_construction(self):
+        b = self.batch
+        self.assertEqual(b.shape, (2, 4))
+        self.assertEqual(b.intensities.tolist(),
+                         [list(row) for row in self._rows])
+        self.assertEqual(list(b[-1].intensities), list(self._rows[1]))
+        self.assertEqual(type(b[0]), Spectrum)
+        self.assertEqual(len(b[::2]), 1)
+        c = SpectrumBatch.from_spectra(b)
+        self.assertEqual(c.intensities.tolist(), b.intensities.tolist())
+        s = pickle.loads(pickle.dumps(b[1]))
+        self.assertEqual(tuple(s.lines), tuple(b[1].lines))
+        with self.assertRaises(ValueError):
+            SpectrumBatch(self._x, ((1, 2, 3),))
+
+    def test_batch_operations(self):
+        b = self.batch
+        self.assertEqual((b + b).intensities.tolist()[1], [2, 4, 6, 8])
+        self.assertEqual((b - b[1]).intensities.tolist()[1], [0] * 4)
+        self.assertEqual((b * b[1]).maximum[1], (420., 16.))
+        self.assertEqual(b.maximum[0], (150., 4200.))
+        for s, i in zip(b, b.integrate(160., 400.)):
+            self.assertAlmostEqual(s.integrate(160., 400.), i)
+        r = b.resample(Spectrum(((100, 0), (300, 0))))
+        self.assertEqual(r.shape, (2, 2))
+        self.assertAlmostEqual(r[1].get_value(300), 2. + 99.9 / 120.2)
+        with self.assertRaises(TypeError):
+            b + 42
+        with self.assertRaises(ValueError):
+            b + r
+
+    def test_batch_band_intensities(self):
+        spectra = [BlackbodySpectrumConstructor(5777)] * 2
+        b = SpectrumBatch.from_spectra(spectra)
+        self.assertEqual(b.spectrum_type, ElectromagneticSpectrum)
+        bands = b.band_intensities(('VIS', 'NIR'))
+        self.assertAlmostEqual(bands['VIS'][1] / spectra[0].integrate(),
+                               spectra[0].relative_visual_intensity)
+
+
+if __name__ == "__main__":
+    unittest.main()
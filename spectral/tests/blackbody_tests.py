@@ -1,12 +1,27 @@
 """This module provides tests for :py:mod:`spectral.blackbody` module."""
 
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from spectral.blackbody import (BlackbodySpectrumConstructor,
-                                RayleighFilter, PhotoAbsoprtion)
+                                LayeredAtmosphereFilter, RayleighFilter,
+                                PhotoAbsoprtion)
+from spectral.constructor import GridConfig
+from spectral.filter import FilterChain, SpectrumFilter
+from spectral.material import as_vectorized
 from spectral.mock_material import MockMaterial
 
 
+class ScalarMaterial:
+    v = 10**-30.
+
+    def refractive_index(self, wavelength, temperature):
+        return 1. + 10**-9. / wavelength
+
+    def photoeffect_cross_section(self, wavelength, temperature):
+        return 10**-34. * wavelength * 10**7.
+
+
 class TestBlackbodyClasses(unittest.TestCase):
 
     def setUp(self):
@@ -27,6 +42,126 @@ class TestBlackbodyClasses(unittest.TestCase):
         self.assertLess(p.maximum[1], solar.maximum[1],
                         msg="Photo-absorption filter doesn't seem to work")
 
+    def test_array_filters(self):
+        solar = BlackbodySpectrumConstructor(self.t)
+        args = (self.elements, self.molecules, self.t)
+        for f in (RayleighFilter, PhotoAbsoprtion):
+            self.assertEqual(
+                list(f(solar, *args).intensities),
+                [f._func(p, None, args) for p in solar.lines])
+
+    def test_transmission_curve(self):
+        batch = BlackbodySpectrumConstructor.batch((3000., self.t))
+        args = (self.elements, self.molecules, self.t)
+        curve = RayleighFilter.transmission_curve(batch.x_values, *args)
+        self.assertIs(
+            RayleighFilter.transmission_curve(batch.x_values, *args), curve)
+        filtered = curve.apply(batch)
+        self.assertEqual(list(filtered[1].intensities),
+                         list(RayleighFilter(batch[1], *args).intensities))
+        self.assertTrue(all(0. <= t <= 1. for t in curve.transmission))
+        with self.assertRaises(ValueError):
+            curve.apply(BlackbodySpectrumConstructor(self.t))
+
+    def test_filter_chain(self):
+        solar = BlackbodySpectrumConstructor(self.t)
+        args = (self.elements, self.molecules, self.t)
+        chain = FilterChain((RayleighFilter, args), (PhotoAbsoprtion, args))
+        expected = PhotoAbsoprtion(RayleighFilter(solar, *args), *args)
+        for y1, y2 in zip(chain.apply(solar).intensities,
+                          expected.intensities):
+            self.assertAlmostEqual(y1 / y2, 1., places=12)
+        self.assertIs(chain.transmission_curve(solar.x_values),
+                      chain.transmission_curve(solar.x_values))
+        with self.assertRaises(TypeError):
+            FilterChain((SpectrumFilter, args))
+
+    def test_scalar_materials(self):
+        m = ScalarMaterial()
+        adapter = as_vectorized(m)
+        self.assertIs(as_vectorized(m), adapter)
+        self.assertIs(as_vectorized(self.elements[0][0]), self.elements[0][0])
+        self.assertEqual(adapter.v, m.v)
+        solar = BlackbodySpectrumConstructor(self.t)
+        args = (((m, 1.),), self.molecules, self.t)
+        for f in (RayleighFilter, PhotoAbsoprtion):
+            self.assertEqual(
+                list(f(solar, *args).intensities),
+                [f._func(p, None, args) for p in solar.lines])
+        x = list(solar.x_values)
+        self.assertIs(adapter.refractive_index(x, self.t),
+                      adapter.refractive_index(x, self.t))
+
+    def test_layered_atmosphere(self):
+        solar = BlackbodySpectrumConstructor(self.t)
+        layers = [(self.elements, self.molecules / 3., t)
+                  for t in (290., 250., 220.)]
+        expected = solar
+        for layer in layers:
+            expected = PhotoAbsoprtion(RayleighFilter(expected, *layer),
+                                       *layer)
+        filtered = LayeredAtmosphereFilter(solar, layers)
+        for y1, y2 in zip(filtered.intensities, expected.intensities):
+            self.assertAlmostEqual(y1 / y2, 1., places=12)
+        matrix = LayeredAtmosphereFilter.layer_transmissions(
+            solar.x_values, layers, (RayleighFilter,))
+        self.assertEqual(len(matrix), len(layers))
+        self.assertEqual(list(matrix[0]), list(
+            RayleighFilter.transmission_curve(
+                solar.x_values, *layers[0]).transmission))
+
+    def test_vectorized_planck(self):
+        for t in (1000., self.t, 300000.):
+            s = BlackbodySpectrumConstructor(t)
+            self.assertEqual(
+                list(s.intensities),
+                [BlackbodySpectrumConstructor._func(w, t)
+                 for w in s.x_values])
+
+    def test_concurrent_construction(self):
+        c = BlackbodySpectrumConstructor
+        spectrum_range = c._spectrum_range
+        temperatures = [1000. + 500. * i for i in range(40)]
+        expected = [c(t) for t in temperatures]
+        with ThreadPoolExecutor(4) as executor:
+            spectra = list(executor.map(c, temperatures))
+        for s1, s2 in zip(spectra, expected):
+            self.assertEqual(tuple(s1.lines), tuple(s2.lines))
+        self.assertEqual(c._spectrum_range, spectrum_range)
+        s = c(self.t, grid=GridConfig((10**-7, 10**-6), 50))
+        self.assertEqual(len(s.lines), 50)
+        self.assertEqual(s.lines[0][0], 10**-7)
+        s2 = c(2 * self.t, grid=GridConfig((10**-7, 10**-6), 50))
+        self.assertIs(s.x_values.obj, s2.x_values.obj)
+        self.assertGreater((s + s2).maximum[1], s2.maximum[1])
+
+    def test_blackbody_batch(self):
+        temperatures = (1000., self.t, 300000.)
+        batch = BlackbodySpectrumConstructor.batch(temperatures)
+        self.assertEqual(batch.shape[0], len(temperatures))
+        for t, s in zip(temperatures, batch):
+            self.assertEqual(
+                list(s.intensities),
+                [BlackbodySpectrumConstructor._func(w, t)
+                 for w in s.x_values])
+        solar = BlackbodySpectrumConstructor(self.t)
+        batch = BlackbodySpectrumConstructor.batch(
+            temperatures, grid=solar.x_values)
+        self.assertEqual(list(batch[1].intensities), list(solar.intensities))
+        with self.assertRaises(ValueError):
+            BlackbodySpectrumConstructor.batch((0.5,))
+
+    def test_band_intensities(self):
+        solar = BlackbodySpectrumConstructor(self.t)
+        names = ('FUV', 'MUV', 'NUV', 'VIS', 'NIR')
+        bands = solar.band_intensities(names)
+        self.assertEqual(tuple(bands), names)
+        for name in names:
+            self.assertAlmostEqual(bands[name] / solar.integrate(),
+                                   solar.get_intensity_in_band(name) /
+                                   solar.integrate(), places=12)
+        self.assertEqual(len(solar.band_intensities()), len(solar.bands))
+
 
 if __name__ == "__main__":
     unittest.main()
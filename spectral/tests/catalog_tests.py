@@ -0,0 +1,111 @@
+"""This module provides tests for :py:mod:`spectral.catalog` module."""
+
+import io
+import math
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from spectral import catalog, executor
+from spectral.__main__ import main
+from spectral.blackbody import BlackbodySpectrumConstructor
+from spectral.color_tools import ColorGenerator
+from spectral.constructor import GridConfig
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self._table = ("id,temperature,radius,name\n"
+                       "1,5777,1,Sun\n"
+                       "2,9940,1.71,Sirius\n"
+                       "3,22400,7.4,Spica\n"
+                       "4,3200,883,Antares\n"
+                       "α Cen C,3042,0.141,Proxima\n")
+
+    def test_process_chunk(self):
+        ids = ['Sun', 'Spica']
+        columns = catalog.process_chunk(ids, (5777., 22400.), (1., 7.4))
+        self.assertEqual(columns['id'], ids)
+        for i, (t, r) in enumerate(((5777., 1.), (22400., 7.4))):
+            grid = GridConfig(catalog.spectral_range(t), 300)
+            s = BlackbodySpectrumConstructor(t, grid=grid)
+            area = 4. * math.pi * (catalog.SUN_RADIUS * r) ** 2.
+            self.assertAlmostEqual(
+                columns['luminosity'][i] / (s.integrate() * area), 1.)
+            self.assertAlmostEqual(columns['visible_fraction'][i],
+                                   s.relative_visual_intensity)
+            self.assertEqual(columns['peak_wavelength'][i], s.maximum[0])
+            self.assertEqual([columns[c][i] for c in 'rgb'],
+                             ColorGenerator.spectrum_to_rgb(s))
+
+    def test_chunk_independence(self):
+        alone = catalog.process_chunk(['a'], (3700.,), (1.,))
+        mixed = catalog.process_chunk(['b', 'a', 'c', 'd'],
+                                      (3000., 3700., 3000., 3800.),
+                                      (2., 1., 2., 1.))
+        for name, _ in catalog.COLUMNS:
+            self.assertEqual(mixed[name][1], alone[name][0])
+        self.assertEqual(mixed['b'][0], mixed['b'][2])
+        self.assertEqual(mixed['luminosity'][0], mixed['luminosity'][2])
+
+    def test_spectral_range(self):
+        for t in (1000., 1199., 3000., 5777., 22400., 250000., 10**6):
+            w0, w1 = BlackbodySpectrumConstructor._define_spectral_range(t)
+            b0, b1 = catalog.spectral_range(t)
+            self.assertLessEqual(b0, w0)
+            self.assertGreaterEqual(b1, w1)
+            self.assertEqual(catalog.spectral_range(t * 1.001), (b0, b1))
+
+    def test_run(self):
+        chunks = list(catalog.read_catalog(io.StringIO(self._table), 2))
+        self.assertEqual([len(c[0]) for c in chunks], [2, 2, 1])
+        output = io.BytesIO()
+        with ThreadPoolExecutor(2) as pool, executor.using_executor(pool):
+            n = catalog.run(io.StringIO(self._table), output, chunk_size=2)
+        self.assertEqual(n, 5)
+        output.seek(0)
+        groups = list(catalog.read_results(output))
+        self.assertEqual([len(g['id']) for g in groups], [2, 2, 1])
+        self.assertEqual([i for g in groups for i in g['id']],
+                         ['1', '2', '3', '4', 'α Cen C'])
+        self.assertEqual([r for g in groups for r in g['radius']],
+                         [1., 1.71, 7.4, 883., 0.141])
+        expected = catalog.process_chunk(*chunks[1])
+        for name, _ in catalog.COLUMNS:
+            self.assertEqual(list(groups[1][name]), list(expected[name]))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            list(catalog.read_catalog(io.StringIO("id,radius\n1,1\n")))
+        for row in ('1,nan,1', '1,inf,1', '1,0,1', '1,x,1', '1,5777',
+                    '1,5777,nan', '1,5777,inf', '1,5777,0', '1,5777,-1',
+                    '1,5777,', '1,,'):
+            with self.assertRaisesRegex(ValueError, 'star 1 '):
+                list(catalog.read_catalog(io.StringIO(
+                    "id,temperature,radius\n%s\n" % row)))
+        with self.assertRaisesRegex(ValueError, 'no id'):
+            list(catalog.read_catalog(io.StringIO(
+                "temperature,radius,id\n5777,1\n")))
+        with self.assertRaises(ValueError):
+            list(catalog.read_results(io.BytesIO(b'NOPE\x01\x00\x00\x00')))
+        output = io.BytesIO()
+        catalog.run(io.StringIO(self._table), output)
+        with self.assertRaises(ValueError):
+            list(catalog.read_results(io.BytesIO(output.getvalue()[:-1])))
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as path:
+            input_path = os.path.join(path, 'stars.csv')
+            output_path = os.path.join(path, 'results.spc')
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(self._table)
+            main(['catalog', input_path, output_path, '--workers', '1',
+                  '--chunk-size', '3'])
+            groups = list(catalog.read_results(output_path))
+        self.assertEqual([len(g['id']) for g in groups], [3, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
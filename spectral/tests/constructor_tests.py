@@ -2,7 +2,7 @@
 
 import unittest
 
-from spectral.constructor import SpectrumConstructor
+from spectral.constructor import GridConfig, SpectrumConstructor
 
 
 class TestSpectrumConstructorAbstractClass(unittest.TestCase):
@@ -10,6 +10,24 @@ class TestSpectrumConstructorAbstractClass(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             c = SpectrumConstructor()
 
+    def test_grid_config(self):
+        grid = GridConfig((1., 2.), 4, False)
+        self.assertEqual(list(grid.wavelist), [1., 1.25, 1.5, 1.75])
+        with self.assertRaises(ValueError):
+            GridConfig((2., 1.))
+        with self.assertRaises(ValueError):
+            GridConfig(precision=1)
+        with self.assertRaises(ValueError):
+            GridConfig(precision=10).wavelist
+
+    def test_grid_cache(self):
+        grid = GridConfig((1., 2.), 10, True)
+        waves = grid.wavelist
+        self.assertIs(GridConfig((1., 2.), 10, True).wavelist, waves)
+        self.assertTrue(waves.readonly)
+        self.assertEqual(len(waves), 10)
+        self.assertAlmostEqual(waves[-1], 2.)
+
 
 if __name__ == "__main__":
     unittest.main()
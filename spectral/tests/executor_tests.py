@@ -0,0 +1,57 @@
+"""This module provides tests for :py:mod:`spectral.executor` module."""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from spectral import executor
+from spectral.blackbody import BlackbodySpectrumConstructor, RayleighFilter
+from spectral.mock_material import MockMaterial
+
+
+def _double(chunk, k=2):
+    return [k * x for x in chunk]
+
+
+class TestExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self._threshold = executor.PARALLEL_THRESHOLD
+
+    def tearDown(self):
+        executor.PARALLEL_THRESHOLD = self._threshold
+        executor.set_executor('process')
+
+    def test_map_chunks(self):
+        items = list(range(1000))
+        expected = _double(items, 3)
+        self.assertEqual(executor.map_chunks(_double, items, 3), expected)
+        for name in ('serial', 'thread', 'process'):
+            with executor.using_executor(name):
+                self.assertEqual(
+                    executor.map_chunks(_double, items, 3, threshold=1),
+                    expected)
+        with ThreadPoolExecutor(2) as pool:
+            with executor.using_executor(pool) as e:
+                self.assertIs(executor.get_executor(), pool)
+                self.assertIs(e, pool)
+            self.assertIsNot(executor.get_executor(), pool)
+        executor.set_executor('serial')
+        self.assertIsNone(executor.get_executor())
+        with self.assertRaises(ValueError):
+            executor.set_executor('NOT IMPLEMENTED EXECUTOR')
+
+    def test_parallel_processing(self):
+        s = BlackbodySpectrumConstructor(5777)
+        args = (((MockMaterial(), 1.),), 10**25, 290.)
+        expected = RayleighFilter(s, *args)
+        resampled = s.resample(expected)
+        executor.PARALLEL_THRESHOLD = 10
+        with ThreadPoolExecutor(2) as pool, executor.using_executor(pool):
+            self.assertEqual(tuple(RayleighFilter(s, *args).lines),
+                             tuple(expected.lines))
+            self.assertEqual(tuple(s.resample(expected).lines),
+                             tuple(resampled.lines))
+
+
+if __name__ == "__main__":
+    unittest.main()
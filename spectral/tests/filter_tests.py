@@ -1,6 +1,7 @@
 """This module provides tests for :py:mod:`spectral.filter` module."""
 
 import unittest
+from array import array
 
 from spectral.spectrum import Spectrum
 from spectral.filter import SpectrumFilter
@@ -13,6 +14,48 @@ class TestFilterAbstractClass(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             c = SpectrumFilter(s)
 
+    def test_array_filter(self):
+        class Scale(SpectrumFilter):
+            @staticmethod
+            def _func(spectrum_x_y, filter_x_y, args):
+                return spectrum_x_y[1] * filter_x_y[1] * args[0]
+
+        class ArrayScale(Scale):
+            @staticmethod
+            def _func_array(x, y, filter_y, args):
+                return [y0 * f * args[0] for y0, f in zip(y, filter_y)]
+
+        values = ((150, 4200), (200.1, 943.99), (320.3, 536), (420., 656))
+        s = Spectrum(values)
+        f = Spectrum(((100, 1.), (300, 2.), (500, 3.)), interpolation='line')
+        self.assertEqual(tuple(ArrayScale(s, f, 2.).lines),
+                         tuple(Scale(s, f, 2.).lines))
+
+    def test_transmission_curve(self):
+        calls = []
+
+        class Scale(SpectrumFilter):
+            @staticmethod
+            def _transmission(x, args):
+                calls.append(args)
+                if args[0] is None:
+                    raise TypeError("no factor")
+                return [args[0]] * len(x)
+
+        grid = memoryview(array('d', (1., 2., 3.))).toreadonly()
+        curve = Scale.transmission_curve(grid, 2.)
+        self.assertIs(Scale.transmission_curve(grid, 2.), curve)
+        self.assertIs(Scale.transmission_curve([1., 2., 3.], 2.), curve)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(list(curve.transmission), [2.] * 3)
+        # unhashable parameters aren't cached
+        Scale.transmission_curve(grid, 2., {})
+        Scale.transmission_curve(grid, 2., {})
+        self.assertEqual(len(calls), 3)
+        with self.assertRaises(TypeError):
+            Scale.transmission_curve(grid, None)
+        self.assertEqual(len(calls), 4)
+
 
 if __name__ == "__main__":
     unittest.main()
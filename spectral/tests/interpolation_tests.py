@@ -2,7 +2,7 @@
 
 import unittest
 
-from spectral.interpolation import Interpolation
+from spectral.interpolation import Interpolation, Interpolator
 
 
 class TestInterpolationMethods(unittest.TestCase):
@@ -31,6 +31,48 @@ class TestInterpolationMethods(unittest.TestCase):
             for x, y in self._values:
                 self.assertEqual(I.interpolate(self._values, x, m), y)
 
+    def test_interpolate_many(self):
+        I = Interpolation
+        xs = (float('-Inf'), 0.5, 1.1, 1.29, 1.31, 2.0, 4.5, 7.0, 12.0)
+        for m in I.available_methods:
+            self.assertEqual(I.interpolate_many(self._values, xs, m),
+                             [I.interpolate(self._values, x, m) for x in xs])
+        self.assertEqual(I.interpolate_many(self._values, xs[1:5], 'point'),
+                         [4.3, 4.3, 4.3, 3.1])
+        self.assertAlmostEqual(
+            I.interpolate_many(self._values, (1.3,), 'line')[0], 3.7)
+
+    def test_interpolator(self):
+        x, y = zip(*self._values)
+        xs = (float('-Inf'), 0.5, 1.1, 1.29, 1.31, 2.0, 4.5, 7.0, 12.0)
+        for m in Interpolation.available_methods:
+            f = Interpolator(x, y, m)
+            for x0, y0 in zip(xs, Interpolation.interpolate_many(
+                    self._values, xs, m)):
+                self.assertAlmostEqual(f(x0), y0, places=12)
+        with self.assertRaises(ValueError):
+            Interpolator(x, y, 'NOT IMPLEMENTED METHOD')
+        for m in ('line', 'cubic'):
+            with self.assertRaises(ValueError):
+                Interpolator((1., 2., 2., 3.), (1., 2., 3., 4.), m)
+
+    def test_cubic_spline(self):
+        x = (0., 0.3, 0.5, 1.4, 2., 3.7, 4.1, 6.)
+        f = Interpolator(x, [2. * v - 1. for v in x], 'cubic')
+        for x0 in (0.1, 0.45, 2.5, 5.9):
+            self.assertAlmostEqual(f(x0), 2. * x0 - 1., places=12)
+        y = (0.5, -1., 2., 0., 3.5, 1., -2., 0.)
+        f = Interpolator(x, y, 'cubic')
+        e = 10.**-7
+        for x0 in x[1:-1]:
+            self.assertAlmostEqual((f(x0 + e) - f(x0)) / e,
+                                   (f(x0) - f(x0 - e)) / e, places=4,
+                                   msg='Spline derivative is not continuous.')
+        for x0, x1 in ((None, None), (0.4, 3.9), (1., 1.2)):
+            w = Interpolator.integration_weights(x, 'cubic', x0, x1)
+            self.assertAlmostEqual(sum(a * b for a, b in zip(w, y)),
+                                   f.integrate(x0, x1), places=12)
+
 
 if __name__ == "__main__":
     unittest.main()
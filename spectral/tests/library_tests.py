@@ -0,0 +1,131 @@
+"""This module provides tests for :py:mod:`spectral.library` module."""
+
+import os
+import tempfile
+import unittest
+
+from spectral.batch import SpectrumBatch
+from spectral.blackbody import (BlackbodySpectrumConstructor,
+                                ElectromagneticSpectrum)
+from spectral.library import SpectralLibrary
+from spectral.spectrum import Spectrum
+
+
+class TestSpectralLibrary(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._dir.name, 'library')
+        self.temperatures = list(range(3000, 9000, 500))
+        self.batch = BlackbodySpectrumConstructor.batch(self.temperatures)
+
+    def tearDown(self):
+        self._dir.cleanup()
+
+    def test_append_and_get(self):
+        s = Spectrum(((1., 2.), (2., 3.)), interpolation='line')
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures, self.batch)
+            library.append(('spectrum', 1), s)
+            self.assertEqual(len(library), len(self.temperatures) + 1)
+            self.assertIn(5000, library)
+            self.assertNotIn(5001, library)
+            x = library[5000]
+            self.assertEqual(type(x), ElectromagneticSpectrum)
+            self.assertEqual(x.lines, self.batch[4].lines)
+            self.assertIsInstance(x._y, memoryview)
+            self.assertEqual(library[('spectrum', 1)].lines, s.lines)
+            self.assertEqual(library[('spectrum', 1)].interpolation, 'line')
+            with self.assertRaises(KeyError):
+                library[6001]
+
+    def test_reopen_and_append(self):
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures, self.batch)
+        with SpectralLibrary(self.path) as library:
+            self.assertEqual(list(library.keys()), self.temperatures)
+            s = BlackbodySpectrumConstructor.batch(
+                (1000,), grid=self.batch.x_values)[0]
+            library.append(1000, s)
+            self.assertEqual(library[1000].lines, s.lines)
+            self.assertEqual(library[8500].lines, self.batch[-1].lines)
+        library = SpectralLibrary(self.path)
+        self.assertEqual(len(library), len(self.temperatures) + 1)
+        self.assertEqual(len(os.listdir(self.path)), 2)
+        library.close()
+
+    def test_append_only(self):
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures, self.batch)
+            with self.assertRaises(KeyError):
+                library.append(3000, self.batch[0])
+            with self.assertRaises(KeyError):
+                library.append_batch((1, 1), self.batch[:2])
+            with self.assertRaises(ValueError):
+                library.append_batch((1, 2), self.batch)
+            with self.assertRaises(TypeError):
+                library.append(object(), self.batch[0])
+            self.assertEqual(len(library), len(self.temperatures))
+
+    def test_batches(self):
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures, self.batch)
+            library.append('line', Spectrum(((1., 2.), (2., 3.))))
+            chunks = list(library.batches(chunk_size=5))
+        self.assertEqual([len(keys) for keys, _ in chunks], [5, 5, 2, 1])
+        keys = [k for chunk, _ in chunks for k in chunk]
+        self.assertEqual(keys, self.temperatures + ['line'])
+        integrals = [v for _, b in chunks[:3] for v in b.integrate()]
+        self.assertEqual(integrals, self.batch.integrate())
+        maxima = [v for _, b in chunks[:3] for v in b.maximum]
+        self.assertEqual(maxima, self.batch.maximum)
+        self.assertEqual(chunks[3][1].maximum, [(2., 3.)])
+        self.assertIsInstance(chunks[0][1], SpectrumBatch)
+        self.assertEqual(chunks[3][1].spectrum_type, Spectrum)
+
+    def test_interrupted_append(self):
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures[:3], self.batch[:3])
+        grid_path = os.path.join(self.path, 'grid-0.spec')
+        row = 8 * len(self.batch.x_values)
+        with open(grid_path, 'ab') as f:
+            # a row without a key and a half of a row
+            f.write(bytes(row + row // 2))
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures[3:], self.batch[3:])
+            self.assertEqual(os.path.getsize(grid_path) % 8, 0)
+            for i, t in enumerate(self.temperatures):
+                self.assertEqual(library[t].lines, self.batch[i].lines)
+            chunks = list(library.batches(chunk_size=5))
+        self.assertEqual([len(keys) for keys, _ in chunks], [3, 5, 4])
+        keys = [k for chunk, _ in chunks for k in chunk]
+        self.assertEqual(keys, self.temperatures)
+        integrals = [v for _, b in chunks for v in b.integrate()]
+        self.assertEqual(integrals, self.batch.integrate())
+
+    def test_interrupted_index(self):
+        with SpectralLibrary(self.path) as library:
+            library.append_batch(self.temperatures[:3], self.batch[:3])
+        index_path = os.path.join(self.path, 'index.jsonl')
+        with open(index_path) as f:
+            index = f.read()
+        for i, broken in enumerate(('[4000, 0, 3', '[4000\n',
+                                    '{"key": "c", ')):
+            with open(index_path, 'w') as f:
+                f.write(index + broken)
+            with SpectralLibrary(self.path) as library:
+                self.assertEqual(list(library.keys()),
+                                 self.temperatures[:3])
+                library.append(i, self.batch[4])
+            with SpectralLibrary(self.path) as library:
+                self.assertEqual(list(library.keys()),
+                                 self.temperatures[:3] + [i])
+                self.assertEqual(library[i].lines, self.batch[4].lines)
+        with open(index_path, 'w') as f:
+            f.write(index + '[4000\n[4500, 0, 3]\n')
+        with self.assertRaises(ValueError):
+            SpectralLibrary(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+"""This module provides tests for :py:mod:`spectral.reader` module."""
+
+import io
+import os
+import tempfile
+import unittest
+
+from spectral.blackbody import ElectromagneticSpectrum
+from spectral.reader import read_chunks, read_spectrum
+
+
+class TestReader(unittest.TestCase):
+
+    def setUp(self):
+        self._table = ("# measured spectrum\n"
+                       "wavelength,flux,error\n"
+                       "400,1.5,0.1\n"
+                       "\n"
+                       "300, 2.5 ,0.1\r\n"
+                       "# comment\n"
+                       "500,3.5,0.2")
+
+    def test_read_spectrum(self):
+        s = read_spectrum(io.StringIO(self._table), delimiter=',',
+                          skip_rows=2, x_unit='nm', y_scale=2.,
+                          spectrum_type=ElectromagneticSpectrum,
+                          interpolation='line')
+        self.assertEqual(type(s), ElectromagneticSpectrum)
+        self.assertEqual(s.interpolation, 'line')
+        self.assertEqual(list(s.intensities), [5., 3., 7.])
+        for x, y in zip(s.x_values, (300., 400., 500.)):
+            self.assertAlmostEqual(x, y * 10**-9)
+
+    def test_read_file(self):
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'spectrum.txt')
+            with open(path, 'w') as f:
+                f.write("1 10 x\n2\t20 y\n3  30 z\n")
+            s = read_spectrum(path, columns=(1, 0))
+        self.assertEqual(list(s.x_values), [10., 20., 30.])
+        self.assertEqual(list(s.intensities), [1., 2., 3.])
+
+    def test_read_chunks(self):
+        table = "".join("%d %d\n" % (i, 2 * i) for i in range(10))
+        chunks = list(read_chunks(io.StringIO(table), chunk_size=4,
+                                  x_unit=2.))
+        self.assertEqual([len(x) for x, _ in chunks], [4, 4, 2])
+        self.assertEqual([v for x, _ in chunks for v in x],
+                         [2. * i for i in range(10)])
+        self.assertEqual([v for _, y in chunks for v in y],
+                         [2. * i for i in range(10)])
+        self.assertEqual(list(read_chunks(io.StringIO(''))), [])
+
+    def test_ragged_rows(self):
+        table = "1 2 3\n4 5\n6 7 8 9\n"
+        for delimiter in (None, ','):
+            if delimiter:
+                table = table.replace(' ', delimiter)
+            (x, y), = read_chunks(io.StringIO(table), delimiter=delimiter)
+            self.assertEqual(list(x), [1., 4., 6.])
+            self.assertEqual(list(y), [2., 5., 7.])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            list(read_chunks(io.StringIO("1 2\n3\n")))
+        with self.assertRaises(ValueError):
+            list(read_chunks(io.StringIO("1 2\n3 a\n")))
+        with self.assertRaises(ValueError):
+            list(read_chunks(io.StringIO("1 2\n"), x_unit='parsec'))
+        with self.assertRaises(ValueError):
+            list(read_chunks(io.StringIO("1 2\n"), chunk_size=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""This module provides tests for :py:mod:`spectral.shared` module."""
+
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from spectral import executor, shared
+from spectral.batch import SpectrumBatch
+from spectral.blackbody import BlackbodySpectrumConstructor
+from spectral.constructor import GridConfig
+from spectral.filter import SpectrumFilter
+
+
+class Scale(SpectrumFilter):
+    @staticmethod
+    def _func(spectrum_x_y, filter_x_y, args):
+        return spectrum_x_y[1] * filter_x_y[1] * args[0]
+
+
+def _mapped_blocks():
+    return len(shared._blocks)
+
+
+class TestShared(unittest.TestCase):
+
+    def setUp(self):
+        self._threshold = executor.PARALLEL_THRESHOLD
+        self.spectrum = BlackbodySpectrumConstructor(
+            5800, grid=GridConfig(precision=2000))
+        self.other = BlackbodySpectrumConstructor(
+            6000, grid=GridConfig(precision=3000))
+
+    def tearDown(self):
+        executor.PARALLEL_THRESHOLD = self._threshold
+
+    def test_share_and_pickle(self):
+        with shared.sharing(self.spectrum) as s:
+            self.assertTrue(shared.is_shared(s))
+            self.assertFalse(shared.is_shared(self.spectrum))
+            self.assertEqual(type(s), type(self.spectrum))
+            self.assertEqual(s.lines, self.spectrum.lines)
+            data = pickle.dumps(s)
+            self.assertGreater(len(data), 2000 * 8)
+            view = pickle.loads(pickle.dumps(shared.transportable(s._y)))
+            self.assertIsInstance(view, shared.SharedView)
+            with shared.resolving((view, 1.)) as (y, a):
+                self.assertEqual(list(y), list(s._y))
+                self.assertEqual(a, 1.)
+            h = shared.handle(s._y)
+            self.assertEqual(h.shape, (2000,))
+            self.assertEqual(h.dtype, 'd')
+            self.assertEqual(list(shared.attach(h)), list(s._y))
+        self.assertIsNone(shared.handle(s._y))
+        self.assertEqual(pickle.loads(data).lines, self.spectrum.lines)
+
+    def test_share_batch(self):
+        b = SpectrumBatch.from_spectra((self.spectrum, self.spectrum))
+        with shared.sharing(b) as sb:
+            self.assertTrue(shared.is_shared(sb))
+            self.assertTrue(shared.is_shared(sb[1]))
+            self.assertEqual(sb.maximum, b.maximum)
+            self.assertEqual(sb.integrate(), b.integrate())
+            data = pickle.dumps(sb)
+        self.assertEqual(pickle.loads(data).integrate(), b.integrate())
+
+    def test_parallel_processing(self):
+        with executor.using_executor('serial'):
+            resampled = self.spectrum.resample(self.other)
+            filtered = Scale(self.spectrum, self.other, 2.)
+        executor.PARALLEL_THRESHOLD = 100
+        with shared.sharing(self.spectrum) as s:
+            for pool in (ThreadPoolExecutor(2), ProcessPoolExecutor(2)):
+                with pool, executor.using_executor(pool):
+                    self.assertEqual(s.resample(self.other).lines,
+                                     resampled.lines)
+                    self.assertEqual(Scale(s, self.other, 2.).lines,
+                                     filtered.lines)
+
+    def test_workers_close_blocks(self):
+        executor.PARALLEL_THRESHOLD = 100
+        with shared.sharing(self.spectrum) as s:
+            with ProcessPoolExecutor(1) as pool, \
+                    executor.using_executor(pool):
+                for _ in range(5):
+                    s.resample(self.other)
+                    Scale(s, self.other, 2.)
+                self.assertEqual(pool.submit(_mapped_blocks).result(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,8 @@
 """This module provides tests for :py:mod:`spectral.spectrum` module."""
 
+import io
+import os
+import tempfile
 import unittest
 
 from spectral.spectrum import Spectrum
@@ -43,6 +46,88 @@ class TestSpectrumClass(unittest.TestCase):
         s_y = s.intensities
         data = tuple(zip(s_x, s_y))
         self.assertEqual(data, self._values)
+        self.assertEqual(tuple(s.lines), self._values)
+        self.assertEqual(s.lines[-1], self._values[-1])
+
+    def test_spectrum_from_arrays(self):
+        x, y = zip(*reversed(self._values))
+        s = Spectrum.from_arrays(x, y)
+        self.assertEqual(tuple(s.lines), self._values)
+        s2 = Spectrum(self._values)
+        self.assertEqual((s + s2).maximum, (150, 8400))
+        with self.assertRaises(ValueError):
+            Spectrum.from_arrays(x, y[1:])
+
+    def test_spectrum_interpolator(self):
+        s = Spectrum(self._values, interpolation='line')
+        f = s.interpolator
+        self.assertIs(s.interpolator, f)
+        self.assertAlmostEqual(s.get_value(175.05), (4200 + 943.99) / 2)
+        s.interpolation = 'none'
+        self.assertIsNot(s.interpolator, f)
+        self.assertEqual(s.get_values((160, 420.)), [943.99, 656])
+
+    def test_spectrum_integrate(self):
+        s = Spectrum(((0., 0.), (1., 2.), (2., 4.), (4., 8.)), 'line')
+        self.assertAlmostEqual(s.integrate(), 16.)
+        self.assertAlmostEqual(s.integrate(0.5, 3.), 8.75)
+        self.assertAlmostEqual(s.integrate(-5., 0.5), 0.25)
+        s.interpolation = 'none'
+        self.assertAlmostEqual(s.integrate(0.5, 1.5), 3.)
+        with self.assertRaises(ValueError):
+            s.integrate(3., 1.)
+
+    def test_spectrum_save_load(self):
+        s = Spectrum(self._values, interpolation='line')
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'spectrum.spec')
+            s.save(path)
+            for copy in (False, True):
+                loaded = Spectrum.load(path, copy=copy)
+                self.assertEqual(type(loaded), Spectrum)
+                self.assertEqual(loaded.interpolation, 'line')
+                self.assertEqual(loaded.lines, s.lines)
+                self.assertEqual(loaded.integrate(), s.integrate())
+            self.assertIsInstance(Spectrum.load(path)._y, memoryview)
+            del loaded
+        f = io.BytesIO()
+        s.save(f)
+        self.assertEqual(len(f.getvalue()) % 8, 0)
+        f.seek(0)
+        self.assertEqual(Spectrum.load(f).lines, s.lines)
+
+    def test_spectrum_load_position(self):
+        s1 = Spectrum(self._values, interpolation='line')
+        s2 = Spectrum(self._values[:2])
+        with tempfile.TemporaryDirectory() as path:
+            path = os.path.join(path, 'spectra.spec')
+            with open(path, 'wb') as f:
+                f.write(b'\x00' * 8)
+                s1.save(f)
+                s2.save(f)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for f in (open(path, 'rb'), io.BytesIO(data)):
+                with f:
+                    f.seek(8)
+                    self.assertEqual(Spectrum.load(f).lines, s1.lines)
+                    self.assertEqual(Spectrum.load(f, True).lines, s2.lines)
+                    self.assertEqual(f.tell(), len(data))
+
+    def test_spectrum_load_errors(self):
+        f = io.BytesIO()
+        Spectrum(self._values).save(f)
+        data = f.getvalue()
+        for broken in (b'', b'SPEK' + data[4:], data[:4] + b'\x09' + data[5:],
+                       data[:-8], data.replace(b'Spectrum', b'Spectrux')):
+            with self.assertRaises(ValueError):
+                Spectrum.load(io.BytesIO(broken))
+
+        class OtherSpectrum(Spectrum):
+            pass
+
+        with self.assertRaises(TypeError):
+            OtherSpectrum.load(io.BytesIO(data))
 
 
 if __name__ == "__main__":
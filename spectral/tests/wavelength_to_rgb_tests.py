@@ -1,9 +1,15 @@
 """This module provides tests for :py:mod:`spectral.wavelength_to_rgb` module.
 """
 
+import json
+import pickle
 import unittest
 
-from spectral.color_tools import ColorGenerator
+from spectral.batch import SpectrumBatch
+from spectral.blackbody import BlackbodySpectrumConstructor
+from spectral.color_tools import (CIEColorGenerator, ColorGenerator,
+                                  TemperatureColorTable,
+                                  WavelengthColorTable)
 
 
 class TestWavelengthToRgb(unittest.TestCase):
@@ -23,6 +29,169 @@ class TestWavelengthToRgb(unittest.TestCase):
         self.assertGreater(sum(x), 0)
         self.assertGreater(sum(y), 0)
 
+    def test_array_version(self):
+        waves = [w * 10**-9 for w in (300., 400., 500., 600., 700., 800.)]
+        for float_values in (False, True):
+            x = ColorGenerator.wavelengths_to_rgb(
+                waves, 0.5, float_values=float_values)
+            self.assertEqual(len(x), len(waves))
+            for w, c in zip(waves, x):
+                self.assertEqual(c, ColorGenerator.wavelength_to_rgb(
+                    w, 0.5, float_values=float_values))
+
+
+class TestSpectrumToRgb(unittest.TestCase):
+    @staticmethod
+    def _reference(spectrum, gamma):
+        """Bin by bin computation of the average color."""
+        color = [0., 0., 0.]
+        lines = spectrum.lines
+        for (w0, i0), (w, i) in zip(lines, lines[1:]):
+            w_a = w0 + 0.5 * (w - w0)
+            if not 380 * 10**-9 <= w_a <= 750 * 10**-9:
+                continue
+            c = ColorGenerator.wavelength_to_rgb(w_a, gamma, True)
+            s = 0.5 * (i + i0) * (w - w0)
+            color = [a + s * b for a, b in zip(color, c)]
+        photons = sum(color)
+        color = [c / photons for c in color]
+        return [c + 1. - max(color) for c in color]
+
+    def test_matches_bin_by_bin(self):
+        for t in (2000, 5800, 20000):
+            s = BlackbodySpectrumConstructor(t)
+            x = ColorGenerator.spectrum_to_rgb(s, 0.7, float_values=True)
+            for a, b in zip(x, self._reference(s, 0.7)):
+                self.assertAlmostEqual(a, b, 12)
+
+    def test_out_of_visual_range(self):
+        s = BlackbodySpectrumConstructor(5800).resample(
+            BlackbodySpectrumConstructor(100))
+        s.lines = [(w, i) for w, i in s.lines if w > 10**-6]
+        self.assertEqual(ColorGenerator.spectrum_to_rgb(s), [0., 0., 0.])
+
+    def test_batch(self):
+        b = BlackbodySpectrumConstructor.batch((3000, 6000, 12000))
+        x = ColorGenerator.batch_to_rgb(b)
+        self.assertEqual(x, [ColorGenerator.spectrum_to_rgb(s) for s in b])
+        self.assertIsInstance(b, SpectrumBatch)
+
+
+class TestWavelengthColorTable(unittest.TestCase):
+    def test_table_matches_direct(self):
+        table = WavelengthColorTable(gamma=0.8, resolution=3701)
+        for n in range(370, 760):
+            w = (n + 0.37) * 10**-9
+            x = table(w, float_values=True)
+            y = ColorGenerator.wavelength_to_rgb(w, float_values=True)
+            for a, b in zip(x, y):
+                self.assertAlmostEqual(a, b, 2)
+
+    def test_table_points_and_borders(self):
+        table = WavelengthColorTable(gamma=1., resolution=38)
+        w = 500 * 10**-9
+        self.assertEqual(table(w), ColorGenerator.wavelength_to_rgb(w, 1.))
+        self.assertEqual(table(379.9 * 10**-9), [0, 0, 0])
+        self.assertEqual(table(750 * 10**-9), [0, 0, 0])
+        self.assertGreater(sum(table(749.9 * 10**-9)), 0)
+        self.assertEqual(table.many([w, w]), [table(w)] * 2)
+
+    def test_bad_resolution(self):
+        with self.assertRaises(ValueError):
+            WavelengthColorTable(resolution=1)
+
+
+class TestCIEColorGenerator(unittest.TestCase):
+    def test_planckian_locus(self):
+        # Chromaticity of blackbody radiation, CIE 1931 2-degree observer
+        for t, x, y in ((2000, 0.5267, 0.4133), (6504, 0.3135, 0.3236)):
+            s = BlackbodySpectrumConstructor(t)
+            xyy = CIEColorGenerator.spectrum_to_xyy(s)
+            self.assertAlmostEqual(xyy[0], x, 3)
+            self.assertAlmostEqual(xyy[1], y, 3)
+
+    def test_srgb(self):
+        red = CIEColorGenerator.spectrum_to_srgb(
+            BlackbodySpectrumConstructor(2000))
+        blue = CIEColorGenerator.spectrum_to_srgb(
+            BlackbodySpectrumConstructor(30000), float_values=True)
+        self.assertEqual(red[0], 255)
+        self.assertGreater(red[0], red[2])
+        self.assertAlmostEqual(blue[2], 1.)
+        self.assertGreater(blue[2], blue[0])
+        self.assertEqual(CIEColorGenerator.xyz_to_srgb((0., 0., 0.)),
+                         [0, 0, 0])
+
+    def test_batch(self):
+        b = BlackbodySpectrumConstructor.batch((3000, 6000, 12000))
+        self.assertEqual(CIEColorGenerator.batch_to_xyz(b),
+                         [CIEColorGenerator.spectrum_to_xyz(s) for s in b])
+        self.assertEqual(CIEColorGenerator.batch_to_srgb(b),
+                         [CIEColorGenerator.spectrum_to_srgb(s) for s in b])
+
+    def test_out_of_range(self):
+        s = BlackbodySpectrumConstructor(100)
+        self.assertEqual(CIEColorGenerator.spectrum_to_xyz(s), [0, 0, 0])
+        self.assertEqual(CIEColorGenerator.spectrum_to_xyy(s), [0., 0., 0.])
+
+
+class TestTemperatureColorTable(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.table = TemperatureColorTable(resolution=256)
+
+    def test_range(self):
+        t0, t1 = self.table.t_range
+        self.assertAlmostEqual(t0, 1199.)
+        self.assertAlmostEqual(t1, 250000.)
+        self.assertEqual(self.table.rgb(100.), self.table.rgb(t0))
+        self.assertEqual(self.table.rgb(10**6), self.table.rgb(t1))
+
+    def test_matches_spectra(self):
+        for t in (2000., 5800., 20000.):
+            s = BlackbodySpectrumConstructor.batch(
+                (t,), grid=TemperatureColorTable._grid)[0]
+            rgb = ColorGenerator.spectrum_to_rgb(s, float_values=True)
+            xyz = CIEColorGenerator.spectrum_to_xyz(s)
+            for a, b in zip(self.table.rgb(t, True), rgb):
+                self.assertAlmostEqual(a, b, 3)
+            for a, b in zip(self.table.xyz(t), xyz):
+                self.assertAlmostEqual(a, b / xyz[1], 3)
+        self.assertEqual(self.table.rgb_many((3000., 4000.)),
+                         [self.table.rgb(3000.), self.table.rgb(4000.)])
+        self.assertEqual(self.table.xyz_many((3000., 4000.)),
+                         [self.table.xyz(3000.), self.table.xyz(4000.)])
+
+    def test_inverse(self):
+        for t in (1500., 3000., 5800., 12000., 100000.):
+            t_rgb = self.table.temperature_for_rgb(self.table.rgb(t, True))
+            t_xyz = self.table.temperature_for_xyz(
+                [5. * c for c in self.table.xyz(t)])
+            self.assertAlmostEqual(t_rgb / t, 1., 6)
+            self.assertAlmostEqual(t_xyz / t, 1., 3)
+        self.assertAlmostEqual(
+            self.table.temperature_for_rgb((255, 0, 0)), 1199.)
+        self.assertAlmostEqual(
+            self.table.temperature_for_rgb((0, 0, 255)), 250000.)
+
+    def test_serialization(self):
+        tables = (
+            pickle.loads(pickle.dumps(self.table)),
+            TemperatureColorTable.from_dict(
+                json.loads(json.dumps(self.table.to_dict()))))
+        for table in tables:
+            self.assertEqual(table.resolution, self.table.resolution)
+            self.assertEqual(table.rgb(4321.), self.table.rgb(4321.))
+            self.assertEqual(table.xyz(4321.), self.table.xyz(4321.))
+            self.assertEqual(table.temperature_for_rgb((255, 200, 100)),
+                             self.table.temperature_for_rgb((255, 200, 100)))
+
+    def test_bad_parameters(self):
+        with self.assertRaises(ValueError):
+            TemperatureColorTable(resolution=1)
+        with self.assertRaises(ValueError):
+            TemperatureColorTable(t_range=(5000., 3000.))
+
 
 if __name__ == "__main__":
     unittest.main()